@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+电访记录校验：按生成器使用的参考数据（area.csv、phone.csv、events.xlsx）逐行检查已有的记录文件，
+输出逐行问题报告（CSV）
+
+    python audit.py 电访记录表.xlsx -o 校验报告.csv
+"""
+import os
+import csv
+import sys
+import time
+import zipfile
+import xml.parsers.expat
+import numpy as np
+import refdata
+from generator import parse_digits, digits_value, parse_id_numbers, resource_path
+from writers import FIELDS, sheet_parts
+
+CHUNK_SIZE = 50000  # 每次校验的行数
+HEADER_ROWS = 10  # 在前几行中查找表头
+XML_READ_SIZE = 1 << 20  # 每次解析的工作表 XML 字节数
+REPORT_FIELDS = ['工作表', '行号', '字段', '值', '问题']
+
+
+class Auditor:
+    """
+    记录校验器：参考数据在构建时整理成有序数组（二分查找）与 地区×号段城市 对照表，
+    每块记录的各项检查都是整列的数组运算
+    """
+    def __init__(self, area, phone, event_sheets):
+        """
+        area: (地区代码数组, 地区名称数组)
+        phone: (号段数组, 号段所属城市数组)
+        event_sheets: {工作表名: (事件数组, 权重数组)}
+        """
+        region_codes, region_names = area
+        self.region_codes, region_ids = np.unique(np.asarray(region_codes, dtype=np.int64), return_inverse=True)
+        phone_codes, phone_cities = phone
+        order = np.argsort(phone_codes, kind='stable')
+        self.phone_codes, first = np.unique(np.asarray(phone_codes, dtype=np.int64)[order], return_index=True)
+        self.phone_cities, self.phone_city_ids = np.unique(np.asarray(phone_cities, dtype=str)[order][first], return_inverse=True)
+        # matches[地区, 号段城市]：地区名称中包含该城市（与生成时按城市筛选地区、号段的规则一致）；
+        # area.csv 中同一代码可能出现在多个城市下，任一名称包含即算一致
+        self.matches = np.zeros((len(self.region_codes), len(self.phone_cities)), dtype=bool)
+        for region_id, name in zip(region_ids.ravel(), np.asarray(region_names, dtype=str)):
+            self.matches[region_id] |= [city != '' and city in name for city in self.phone_cities]
+        self.events = np.unique(np.concatenate([np.asarray(texts, dtype=str) for texts, _ in event_sheets.values()]))
+
+    @classmethod
+    def from_resources(cls, area_path=None, phone_path=None, events_path=None):
+        """按程序资源目录（或指定路径）读取参考数据，经 refdata 缓存/快照"""
+        return cls(refdata.load_area(area_path or resource_path('area.csv')),
+                   refdata.load_phone(phone_path or resource_path('phone.csv')),
+                   refdata.load_event_sheets(events_path or resource_path('events.xlsx')))
+
+    @staticmethod
+    def _lookup(sorted_codes, codes):
+        """codes 在有序数组中的下标，不存在时为 -1"""
+        slots = np.minimum(np.searchsorted(sorted_codes, codes), len(sorted_codes) - 1)
+        return np.where(sorted_codes[slots] == codes, slots, -1)
+
+    def check(self, columns):
+        """
+        校验一块记录
+        columns: {'姓名', '电话', '基础信息', '跟进记录'} → 等长字符串数组
+        返回 [(行下标数组, 字段, 问题)]，每项为一类问题
+        """
+        problems = []
+        names, phones, ids, events = (np.asarray(columns[key], dtype=str) for key in FIELDS)
+        n = len(ids)
+        for key, values in zip(FIELDS, (names, phones, ids, events)):
+            problems.append((np.flatnonzero(np.char.str_len(values) == 0), key, f'缺少{key}'))
+
+        # 身份证号：格式、校验位、出生日期、地区代码
+        id_format, bodies, check_ok = parse_id_numbers(ids)
+        region_ids = np.full(n, -1)
+        if id_format.any():
+            rows = np.flatnonzero(id_format)
+            problems.append((rows[~check_ok[rows]], '基础信息', '身份证校验位错误'))
+            bodies = bodies[rows]
+            date = bodies // 1000 % 10**8
+            years, months, days = date // 10000, date // 100 % 100, date % 100
+            month_ok = (months >= 1) & (months <= 12) & (years >= 1800)
+            first = (np.where(month_ok, years, 1970) - 1970).astype('datetime64[Y]').astype('datetime64[M]') + np.where(month_ok, months - 1, 0)
+            month_days = ((first + 1).astype('datetime64[D]') - first.astype('datetime64[D]')).astype(np.int64)
+            problems.append((rows[~(month_ok & (days >= 1) & (days <= month_days))], '基础信息', '出生日期无效'))
+            region_ids[rows] = self._lookup(self.region_codes, bodies // 10**11)
+            problems.append((rows[region_ids[rows] < 0], '基础信息', '地区代码不在 area.csv 中'))
+        problems.append((np.flatnonzero(~id_format & (np.char.str_len(ids) > 0)), '基础信息', '身份证号格式错误'))
+
+        # 电话：11位数字、号段在 phone.csv 中、号段城市与身份证地区一致
+        phone_format = np.char.str_len(phones) == 11
+        if phone_format.any():
+            rows = np.flatnonzero(phone_format)
+            digits = parse_digits(phones[rows], 11)
+            ok = ((digits >= 0) & (digits <= 9)).all(axis=1)
+            phone_format[rows[~ok]] = False
+            rows, digits = rows[ok], digits[ok]
+            slots = self._lookup(self.phone_codes, digits_value(digits) // 10000)
+            problems.append((rows[slots < 0], '电话', '号段不在 phone.csv 中'))
+            known = (slots >= 0) & (region_ids[rows] >= 0)
+            rows, slots = rows[known], slots[known]
+            mismatch = ~self.matches[region_ids[rows], self.phone_city_ids[slots]]
+            problems.append((rows[mismatch], '电话', '号段城市与身份证地区不符'))
+        problems.append((np.flatnonzero(~phone_format & (np.char.str_len(phones) > 0)), '电话', '电话格式错误'))
+
+        # 跟进记录：在事件表中
+        problems.append((np.flatnonzero(~np.isin(events, self.events) & (np.char.str_len(events) > 0)), '跟进记录', '事件不在 events.xlsx 中'))
+        return [(rows, key, problem) for rows, key, problem in problems if len(rows)]
+
+
+class _SheetParser:
+    """
+    expat 流式解析工作表 XML：只取 <c> 的位置、类型与 <v>/<t> 文本，不构建单元格对象
+    columns 为 None 时取整行（用于查找表头），否则只取这些列下标
+    """
+    def __init__(self, shared_strings=None):
+        self.shared_strings = shared_strings or []
+        self.columns = None
+        self.rows = []  # 解析出的 (行号, {列下标: 文本})，由调用方取走
+        self._line = 0
+        self._next_column = 0
+        self._cell = None  # 当前单元格的 (列下标, 类型)
+        self._parts = []  # 当前单元格的文本片段
+        self._text = None  # 正在收集文本时为 _parts
+        self._skip = 0  # 位于 <rPh>（注音）内
+        self._values = None
+        self.parser = xml.parsers.expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self._start
+        self.parser.EndElementHandler = self._end
+        self.parser.CharacterDataHandler = self._characters
+
+    def _start(self, name, attrs):
+        tag = name.rpartition(':')[2]
+        if tag == 'c':
+            ref = attrs.get('r')
+            column = _column_index(ref) if ref else self._next_column
+            self._next_column = column + 1
+            wanted = self.columns is None or column in self.columns
+            self._cell = (column, attrs.get('t', 'n')) if wanted else None
+            self._parts = []
+        elif tag == 'row':
+            self._line = int(attrs['r']) if 'r' in attrs else self._line + 1
+            self._next_column = 0
+            self._values = {}
+        elif tag == 'rPh':
+            self._skip += 1
+        elif (tag == 'v' or tag == 't') and self._cell is not None and not self._skip:
+            self._text = self._parts
+
+    def _characters(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def _end(self, name):
+        tag = name.rpartition(':')[2]
+        if tag == 'v' or tag == 't':
+            self._text = None
+        elif tag == 'c':
+            if self._cell is not None:
+                column, kind = self._cell
+                self._values[column] = self._cell_value(kind, ''.join(self._parts))
+                self._cell = None
+        elif tag == 'row':
+            self.rows.append((self._line, self._values))
+        elif tag == 'rPh':
+            self._skip -= 1
+
+    def _cell_value(self, kind, text):
+        if kind == 's':
+            return self.shared_strings[int(text)] if text else ''
+        if kind == 'n' and text and not text.isdigit():
+            try:
+                number = float(text)  # 数字格式的电话等（可能为 1.36E+10 形式）按整数显示
+            except ValueError:
+                return text.strip()
+            if number.is_integer():
+                return str(int(number))
+        return text.strip()
+
+
+def _column_index(ref):
+    """单元格引用（如 'AB12'）→ 从 0 开始的列下标"""
+    column = 0
+    for char in ref:
+        if char.isdigit():
+            break
+        column = column * 26 + ord(char) - 64
+    return column - 1
+
+
+def _read_shared_strings(archive):
+    """共享字符串表（没有时为空表）；富文本各段拼接，注音忽略"""
+    try:
+        source = archive.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    parts, depth, text = [], [0], [False]
+
+    def start(name, attrs):
+        tag = name.rpartition(':')[2]
+        if tag == 'si':
+            parts.clear()
+        elif tag == 'rPh':
+            depth[0] += 1
+        elif tag == 't' and not depth[0]:
+            text[0] = True
+
+    def end(name):
+        tag = name.rpartition(':')[2]
+        if tag == 'si':
+            strings.append(''.join(parts).strip())
+        elif tag == 'rPh':
+            depth[0] -= 1
+        elif tag == 't':
+            text[0] = False
+
+    def characters(data):
+        if text[0]:
+            parts.append(data)
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler, parser.EndElementHandler, parser.CharacterDataHandler = start, end, characters
+    with source:
+        parser.ParseFile(source)
+    return strings
+
+
+def iter_xlsx_chunks(path, sheet_name=None, chunk_size=CHUNK_SIZE):
+    """
+    流式读取工作簿（默认活动工作表）：直接以 expat 解析工作表 XML，内存只与块大小有关；
+    在前 HEADER_ROWS 行中按表头找到 姓名/电话/基础信息/跟进记录 列，
+    逐块返回 (工作表名, 行号数组, {字段: 字符串数组})；四列都为空的行（如只有序号的模板行）跳过
+    """
+    with zipfile.ZipFile(path) as archive:
+        sheets, active = sheet_parts(archive)
+        names = [name for name, _ in sheets]
+        if sheet_name is not None and sheet_name not in names:
+            raise ValueError(f"工作簿中没有工作表“{sheet_name}”")
+        title, member = sheets[names.index(sheet_name) if sheet_name is not None else active]
+        sheet = _SheetParser(_read_shared_strings(archive))
+        with archive.open(member) as source:
+            yield from _chunks(title, _iter_sheet_records(sheet, source, title), chunk_size)
+
+
+def _iter_sheet_records(sheet, source, title):
+    """逐行返回 (行号, [姓名, 电话, 基础信息, 跟进记录])"""
+    scanned, positions = 0, None
+    while True:
+        data = source.read(XML_READ_SIZE)
+        sheet.parser.Parse(data, not data)
+        rows, sheet.rows = sheet.rows, []
+        for line, values in rows:
+            if positions is None:
+                scanned += 1
+                header = {values[column]: column for column in sorted(values, reverse=True)}
+                if all(key in header for key in FIELDS):
+                    positions = [header[key] for key in FIELDS]
+                    sheet.columns = set(positions)
+                elif scanned >= HEADER_ROWS:
+                    raise ValueError(f"工作表“{title}”的前 {HEADER_ROWS} 行中没有 {'/'.join(FIELDS)} 表头")
+                continue
+            yield line, [values.get(column, '') for column in positions]
+        if not data:
+            break
+    if positions is None:
+        raise ValueError(f"工作表“{title}”中没有 {'/'.join(FIELDS)} 表头")
+
+
+def iter_csv_chunks(path, chunk_size=CHUNK_SIZE):
+    """流式读取 CSV（首行为表头），返回值同 iter_xlsx_chunks（工作表名为文件名）"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = csv.reader(f)
+        header = next(rows, [])
+        missing = [key for key in FIELDS if key not in header]
+        if missing:
+            raise ValueError(f"缺少列：{'、'.join(missing)}")
+        positions = [header.index(key) for key in FIELDS]
+        width = max(positions) + 1
+        records = ((line, [row[i].strip() for i in positions] if len(row) >= width else
+                    [row[i].strip() if i < len(row) else '' for i in positions])
+                   for line, row in enumerate(rows, start=2))
+        yield from _chunks(os.path.basename(path), records, chunk_size)
+
+
+def _chunks(title, records, chunk_size):
+    """(行号, 值列表) → 每 chunk_size 行一块的 (工作表名, 行号数组, {字段: 字符串数组})"""
+    line_numbers, values = [], []
+    for line, record in records:
+        if not any(record):
+            continue
+        line_numbers.append(line)
+        values.append(record)
+        if len(values) >= chunk_size:
+            yield _to_columns(title, line_numbers, values)
+            line_numbers, values = [], []
+    if values:
+        yield _to_columns(title, line_numbers, values)
+
+
+def _to_columns(title, line_numbers, values):
+    columns = np.array(values, dtype=str).reshape(len(values), len(FIELDS))
+    return title, np.array(line_numbers, dtype=np.int64), {key: columns[:, i] for i, key in enumerate(FIELDS)}
+
+
+def audit_file(path, report_path, sheet_name=None, auditor=None, chunk_size=CHUNK_SIZE):
+    """
+    校验记录文件（.xlsx 或 .csv），问题逐行写入 report_path（CSV），返回汇总：
+    {'rows': 检查行数, 'bad_rows': 有问题的行数, 'problems': {问题: 次数}}
+    """
+    auditor = auditor or Auditor.from_resources()
+    if os.path.splitext(path)[1].lower() == '.csv':
+        chunks = iter_csv_chunks(path, chunk_size)
+    else:
+        chunks = iter_xlsx_chunks(path, sheet_name, chunk_size)
+    summary = {'rows': 0, 'bad_rows': 0, 'problems': {}}
+    with open(report_path, 'w', encoding='utf-8-sig', newline='') as f:
+        report = csv.writer(f)
+        report.writerow(REPORT_FIELDS)
+        for sheet_label, line_numbers, columns in chunks:
+            found = auditor.check(columns)
+            bad = np.zeros(len(line_numbers), dtype=bool)
+            entries = []
+            for rows, key, problem in found:
+                bad[rows] = True
+                summary['problems'][problem] = summary['problems'].get(problem, 0) + len(rows)
+                entries.append((rows, np.full(len(rows), key), columns[key][rows], np.full(len(rows), problem)))
+            summary['rows'] += len(line_numbers)
+            summary['bad_rows'] += int(bad.sum())
+            if entries:
+                rows = np.concatenate([e[0] for e in entries])
+                order = np.argsort(rows, kind='stable')  # 按行号排列，同一行的问题相邻
+                report.writerows(zip([sheet_label] * len(rows), line_numbers[rows[order]].tolist(),
+                                     *(np.concatenate([e[i] for e in entries])[order].tolist() for i in (1, 2, 3))))
+    return summary
+
+
+def main(argv=None):
+    """命令行入口"""
+    import argparse
+    parser = argparse.ArgumentParser(description="按参考数据校验电访记录文件")
+    parser.add_argument('path', help="记录文件（.xlsx 或 .csv）")
+    parser.add_argument('-o', '--output', help="问题报告（CSV，默认为 记录文件名.audit.csv）")
+    parser.add_argument('--sheet', help="xlsx 工作表（默认活动工作表）")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help=f"每次校验的行数（默认 {CHUNK_SIZE}）")
+    args = parser.parse_args(argv)
+
+    report_path = args.output or os.path.splitext(args.path)[0] + '.audit.csv'
+    start = time.perf_counter()
+    summary = audit_file(args.path, report_path, args.sheet, chunk_size=args.chunk_size)
+    print(f"已检查 {summary['rows']} 行，{summary['bad_rows']} 行有问题（{time.perf_counter() - start:.2f}秒）")
+    for problem, count in sorted(summary['problems'].items(), key=lambda item: -item[1]):
+        print(f"  {problem}：{count}")
+    print(f"问题报告：{report_path}")
+    return 1 if summary['bad_rows'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准（每次测量都在新的解释器进程中进行，计入解释器启动与模块导入时间）
+
+    python benchmark.py startup --repeat 5 -o startup.json
+    python benchmark.py pipeline --sizes 1000 100000 1000000 --format xlsx -o pipeline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 启动时不应加载的重模块，出现在首个窗口显示前即视为回归
+HEAVY_MODULES = ['numpy', 'pandas', 'openpyxl', 'faker']
+
+# 界面进程：窗口首次显示时记录时间及已加载的重模块，随后立即生成 1 条记录并退出
+_GUI_PROBE = r'''
+import sys, time, json
+sys.path.insert(0, {here!r})
+out = sys.stdout
+marks = {{}}
+import phone_note
+app = phone_note.FinanceApp()
+
+def first_record():
+    from generator import generate_records
+    generate_records((1, 0, 0))
+    marks['first_record'] = time.time()
+    out.write(json.dumps(marks) + '\n')
+    out.flush()
+    app.destroy()
+
+def on_map(event):
+    if 'first_window' not in marks:
+        marks['first_window'] = time.time()
+        marks['modules'] = [m for m in {heavy!r} if m in sys.modules]
+        app.after_idle(first_record)
+
+app.bind('<Map>', on_map, add='+')
+app.mainloop()
+'''
+
+# 命令行/库调用进程：导入生成器并生成 1 条记录
+_CLI_PROBE = r'''
+import sys, time, json
+sys.path.insert(0, {here!r})
+from generator import generate_records
+generate_records((1, 0, 0))
+print(json.dumps({{'first_record': time.time()}}))
+'''
+
+
+def run_json(code, cwd=HERE, timeout=120):
+    """在新进程中运行脚本，返回其最后一行输出的 JSON（失败时返回 None）"""
+    try:
+        proc = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True,
+                              encoding='utf-8', timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    if proc.returncode != 0 or not proc.stdout.strip():
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_probe(code, cwd=HERE, timeout=120):
+    """在新进程中运行探测脚本，返回各时间点相对进程创建的毫秒数（失败时返回 None）"""
+    start = time.time()
+    marks = run_json(code, cwd, timeout)
+    if marks is None:
+        return None
+    return {key: (value - start) * 1000 if isinstance(value, float) else value for key, value in marks.items()}
+
+
+def summarize(samples, key):
+    """多次测量的中位数/最小/最大值（毫秒）"""
+    values = [sample[key] for sample in samples]
+    return {'median_ms': round(statistics.median(values), 1), 'min_ms': round(min(values), 1),
+            'max_ms': round(max(values), 1)}
+
+
+def bench_startup(repeat=5):
+    """
+    启动时间：界面的首个窗口与首条记录、命令行的首条记录
+    没有图形环境时跳过界面部分
+    """
+    result = {'repeat': repeat, 'python': sys.version.split()[0]}
+    gui = [run_probe(_GUI_PROBE.format(here=HERE, heavy=HEAVY_MODULES)) for _ in range(repeat)]
+    if all(gui):
+        result['gui'] = {'first_window': summarize(gui, 'first_window'),
+                         'first_record': summarize(gui, 'first_record'),
+                         'modules_at_first_window': sorted({m for sample in gui for m in sample['modules']})}
+    else:
+        result['gui'] = None
+    cli = [run_probe(_CLI_PROBE.format(here=HERE)) for _ in range(repeat)]
+    result['cli'] = {'first_record': summarize(cli, 'first_record')} if all(cli) else None
+    return result
+
+
+def print_startup(result):
+    """打印启动时间结果"""
+    if result['gui'] is None:
+        print("界面：跳过（无法创建窗口）")
+    else:
+        gui = result['gui']
+        print(f"界面首个窗口：{gui['first_window']['median_ms']} ms（最小 {gui['first_window']['min_ms']} ms）")
+        print(f"界面首条记录：{gui['first_record']['median_ms']} ms（最小 {gui['first_record']['min_ms']} ms）")
+        if gui['modules_at_first_window']:
+            print(f"警告：窗口显示前已加载 {', '.join(gui['modules_at_first_window'])}")
+    if result['cli'] is None:
+        print("命令行：运行失败")
+    else:
+        cli = result['cli']['first_record']
+        print(f"命令行首条记录：{cli['median_ms']} ms（最小 {cli['min_ms']} ms）")
+
+
+def peak_rss():
+    """本进程的峰值常驻内存（字节）"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024  # macOS 为字节，Linux 为 KB
+
+
+# 流水线各阶段：参考数据读取与引擎构建、打开模板、城市/地区代码/手机号抽取、身份证号生成、姓名生成、
+# 事件抽取、写入（写入线程中，与生成并行）、保存文件，以及生成与写入两端互相等待的时间
+PIPELINE_STAGES = ['load', 'open', 'locations', 'ids', 'names', 'events', 'write', 'save', 'wait_write', 'wait_generate']
+
+
+def run_pipeline(records, fmt='xlsx', batch_size=None, seed=0):
+    """
+    在当前进程中单进程运行一次 generator.generate_file（与命令行、界面相同的生成与写入线程流水线），
+    各阶段用时由 RunStats 记录；输出写入临时目录，结束后删除
+    返回 {'records', 'snapshot', 'records_per_s', 'peak_rss_mb', 'output_mb', 'stats'}，stats 为 RunStats.as_dict()，
+    snapshot 为参考数据是否读自 refdata.snap（否则 load 阶段包含解析源文件的时间）
+    """
+    import tempfile
+    from datetime import datetime
+    import generator
+    import refdata
+    from profiling import RunStats
+
+    stats = RunStats()
+    counts = [records - 2 * (records // 3), records // 3, records // 3]
+    with stats.timer('load'):
+        engine = generator.load_engine(ref_date=datetime(2025, 1, 1))
+    with tempfile.TemporaryDirectory() as directory:
+        generator.generate_file(counts, os.path.join(directory, f'bench.{fmt}'), fmt, seed,
+                                batch_size or generator.BATCH_SIZE, engine=engine, stats=stats)
+        summary = stats.as_dict()
+        output_size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    sources = [generator.resource_path(name) for name in ('area.csv', 'phone.csv', 'events.xlsx')]
+    return {'records': records, 'snapshot': all(refdata.uses_snapshot(path) for path in sources),
+            'records_per_s': round(records / summary['elapsed_s'], 1),
+            'peak_rss_mb': round(peak_rss() / 2 ** 20, 1), 'output_mb': round(output_size / 2 ** 20, 2),
+            'stats': summary}
+
+
+_PIPELINE_PROBE = r'''
+import sys, json
+sys.path.insert(0, {here!r})
+import benchmark
+print(json.dumps(benchmark.run_pipeline({records!r}, {fmt!r}, {batch_size!r}, {seed!r})))
+'''
+
+
+def bench_pipeline(sizes=(1000, 100000, 1000000), fmt='xlsx', batch_size=None, seed=0):
+    """各记录数分别在新进程中运行 run_pipeline（峰值内存互不影响）"""
+    result = {'python': sys.version.split()[0], 'platform': sys.platform, 'cpu_count': os.cpu_count(),
+              'format': fmt, 'batch_size': batch_size, 'seed': seed, 'runs': []}
+    for records in sizes:
+        run = run_json(_PIPELINE_PROBE.format(here=HERE, records=records, fmt=fmt, batch_size=batch_size, seed=seed),
+                       timeout=None)
+        if run is None:
+            print(f"{records} 条：运行失败")
+            continue
+        result['runs'].append(run)
+        print_pipeline_run(run)
+    return result
+
+
+def print_pipeline_run(run):
+    """打印一次流水线测量：总用时、吞吐、峰值内存及各阶段占比（写入与生成并行，占比之和可超过 100%）"""
+    total, timers = run['stats']['elapsed_s'], run['stats']['timers']
+    stages = '  '.join(f"{stage} {timers[stage]:.3f}s({timers[stage] / total:.0%})" for stage in PIPELINE_STAGES if timers.get(stage))
+    source = "快照" if run['snapshot'] else "源文件"
+    print(f"{run['records']} 条：{total:.2f} 秒，{run['records_per_s']:.0f} 条/秒，峰值内存 {run['peak_rss_mb']} MB，"
+          f"参考数据读自{source}")
+    print(f"  {stages}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="电访记录生成器性能基准")
+    commands = parser.add_subparsers(dest='command', required=True)
+    startup = commands.add_parser('startup', help="启动时间：首个窗口与首条记录")
+    startup.add_argument('--repeat', type=int, default=5, help="重复次数，取中位数")
+    startup.add_argument('-o', '--output', help="结果保存为 JSON 文件")
+    pipeline = commands.add_parser('pipeline', help="生成流水线：各阶段用时、吞吐与峰值内存")
+    pipeline.add_argument('--sizes', nargs='+', type=int, default=[1000, 100000, 1000000], help="记录数（默认 1000 100000 1000000）")
+    pipeline.add_argument('--format', default='xlsx', help="输出格式（默认 xlsx）")
+    pipeline.add_argument('--batch-size', type=int, help="每批记录数（默认同生成器）")
+    pipeline.add_argument('--seed', type=int, default=0, help="随机种子")
+    pipeline.add_argument('-o', '--output', help="结果保存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    if args.command == 'startup':
+        result = bench_startup(args.repeat)
+        print_startup(result)
+    elif args.command == 'pipeline':
+        result = bench_pipeline(args.sizes, args.format, args.batch_size, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存：{args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
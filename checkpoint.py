@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+可续传的生成：运行中定期把进度保存到输出文件旁的 输出文件名.checkpoint 目录，
+包括运行参数（记录数、种子、出生日期基准日、批大小、格式与选项、参考数据摘要）、已完成的批次数、
+写入器的进度（已写的分片与当前分片的字节数）及号码去重的状态；写到一半的输出文件也保存在该目录中。
+中断后从最后保存的批次继续，各批的随机数只由 种子+批次号 决定，续传结果与不中断时逐字节相同。
+"""
+import os
+import json
+import time
+from fileutil import atomic_write
+
+CHECKPOINT_SECONDS = 30  # 保存进度的间隔（秒）；每次保存要等写入线程写完已生成的批次
+STATE_FILE = 'checkpoint.json'
+STATE_VERSION = 1
+
+
+class CheckpointMismatch(ValueError):
+    """已保存的进度与本次运行的参数不一致"""
+
+
+def checkpoint_dir(output_path):
+    """输出文件对应的进度目录"""
+    return output_path + '.checkpoint'
+
+
+class Checkpoint:
+    """
+    一次可续传运行的进度目录：checkpoint.json 记录进度，unique.NNNNNN.npz 为对应批次时的号码去重状态，
+    其余为写入中的临时输出文件；运行成功结束后整个目录删除
+    """
+    def __init__(self, directory, interval=CHECKPOINT_SECONDS):
+        self.directory = directory
+        self.interval = interval
+        self.state = None  # 最近读取或保存的进度
+        self._saved_at = time.perf_counter()
+
+    def path(self, name):
+        """目录中的文件"""
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        """读取已保存的进度，没有时返回 None"""
+        path = self.path(STATE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"不支持的进度文件版本：{path}")
+        self.state = state
+        return state
+
+    def check(self, params):
+        """已读取的进度须与本次运行的参数一致，否则抛出 CheckpointMismatch"""
+        params = json.loads(json.dumps(params))  # 与保存后读回的形式一致（元组 → 列表等）
+        saved = self.state['params']
+        different = [key for key in params if saved.get(key) != params[key]]
+        if different:
+            raise CheckpointMismatch(f"进度目录 {self.directory} 与本次运行的参数不一致（{'、'.join(different)}），"
+                                     f"请使用相同的参数，或删除该目录后重新生成")
+
+    def due(self):
+        """距上次保存是否已超过间隔"""
+        return time.perf_counter() - self._saved_at >= self.interval
+
+    def postpone(self):
+        """本次未能保存（写入器不能从此处续写），重新计时，避免之后每批都等待写入线程"""
+        self._saved_at = time.perf_counter()
+
+    def save(self, params, batches, records, writer_state, unique=None, files=None):
+        """
+        保存进度（先写临时文件再替换，中途出错保留上一次的进度）
+        batches/records: 已写完的批次数与记录数
+        writer_state: 写入器 checkpoint() 的结果；files: 全部写完后尚待替换的 [(临时文件, 正式文件)]
+        unique: 可选的 uniqueness.UniqueNumbers，与写入器处于同一批次
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        unique_file = None
+        if unique is not None:
+            unique_file = f'unique.{batches:06d}.npz'
+            unique.save(self.path(unique_file))
+        state = {'version': STATE_VERSION, 'params': params, 'batches': batches, 'records': records,
+                 'writer': writer_state, 'unique': unique_file, 'files': files}
+        with atomic_write(self.path(STATE_FILE)) as tmp_path, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        # 之前批次的号码去重状态不再需要
+        for name in os.listdir(self.directory):
+            if name.startswith('unique.') and name.endswith('.npz') and name != unique_file:
+                os.remove(self.path(name))
+        self.state = state
+        self._saved_at = time.perf_counter()
+
+    def restore_unique(self, unique):
+        """把号码去重恢复到已保存的批次"""
+        if self.state.get('unique'):
+            unique.load(self.path(self.state['unique']), resume=True)
+
+    def clear(self):
+        """删除进度目录（运行成功结束或放弃续传时）"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = self.path(name)
+            if os.path.isfile(path):
+                os.remove(path)
+        os.rmdir(self.directory)
+        self.state = None
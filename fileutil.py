@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+先写临时文件再替换目标文件：保存中途出错（或进程退出）不会留下残缺文件，也不损坏原文件
+临时文件与 open() 新建的文件一样按 umask 取得权限（不读取也不改动进程的 umask）；
+替换时若目标文件已存在则改为其原有的权限
+"""
+import os
+import stat
+from contextlib import contextmanager
+
+
+def temp_path(path, suffix=None):
+    """在目标文件所在目录新建一个空的临时文件（随机文件名，权限与 open() 新建的文件相同），返回其路径"""
+    if suffix is None:
+        suffix = os.path.splitext(path)[1]
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp_path = os.path.join(directory, f'tmp{os.urandom(6).hex()}{suffix}')
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return tmp_path
+
+
+def replace_file(tmp_path, path):
+    """以临时文件替换目标文件，沿用目标文件的权限（目标不存在时保留临时文件新建时的权限）"""
+    try:
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+    except FileNotFoundError:
+        pass
+    os.replace(tmp_path, path)
+
+
+def remove_quietly(path):
+    """删除临时文件（不存在时忽略）"""
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
+
+@contextmanager
+def atomic_write(path, suffix=None):
+    """
+    with atomic_write(path) as tmp_path: 写入 tmp_path，正常结束时替换 path；
+    出错时删除临时文件，目标文件保持原样
+    """
+    tmp_path = temp_path(path, suffix)
+    try:
+        yield tmp_path
+        replace_file(tmp_path, path)
+    except BaseException:
+        remove_quietly(tmp_path)
+        raise
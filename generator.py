@@ -0,0 +1,611 @@
+# -*- coding: utf-8 -*-
+"""
+电访记录生成器（不依赖 tkinter，可作为库调用或在命令行运行）
+
+    python generator.py --counts 1000 500 200 -o 电访记录.xlsx --seed 42
+    python generator.py --counts 2000000 500000 500000 -o 电访记录.parquet --format parquet --rows-per-file 1000000
+    python generator.py --counts 5000000 0 0 -o 电访记录.csv --format csv --checkpoint   # 中断后加 --resume 继续
+"""
+import os
+import sys
+from collections import deque
+from datetime import datetime
+import numpy as np
+import refdata
+from profiling import RunStats, profiled
+from checkpoint import Checkpoint, CHECKPOINT_SECONDS, checkpoint_dir
+from sampling import AliasSampler
+
+# 每个市出现的概率
+CITIES = ["太原","晋中","大同","运城","忻州","吕梁","临汾","晋城","朔州","长治","阳泉"]
+CITY_WEIGHTS = [90,1,1,1,1,1,1,1,1,1,1]
+# 三个表页面的名称（记录按此顺序依次分配事件）
+SHEET_NAMES = ['存款', '理财', '贷款']
+# 每批生成的记录数
+BATCH_SIZE = 50000
+# 记录数达到此值时界面改用多进程生成
+PARALLEL_MIN_RECORDS = 4 * BATCH_SIZE
+
+
+class CityIndex:
+    """城市 → 地区代码 / 手机号段 索引，每次生成只构建一次，按整数下标抽样"""
+    def __init__(self, area, phone, cities):
+        """
+        参数：
+        area: area.csv 的 (地区代码数组, 地区名称数组)
+        phone: phone.csv 的 (号段数组, 地区名称数组)
+        cities: 需要建立索引的城市名称列表
+        """
+        self.cities = list(cities)
+        self.region_codes = {}  # {city: ndarray 地区代码}
+        self.phone_codes = {}  # {city: ndarray 手机号段}
+        region_codes, region_names = area
+        phone_codes, phone_names = phone
+        for city in self.cities:
+            # 名称中包含该市即归入该市（与原先 str.contains 的筛选规则一致），只在这里扫描一次
+            self.region_codes[city] = region_codes[np.char.find(region_names, city) >= 0]
+            self.phone_codes[city] = phone_codes[np.char.find(phone_names, city) >= 0]
+        # 按城市下标拼接成连续数组，批量抽样时用 起始位置 + 随机偏移 直接取值
+        self._region_flat, self._region_start, self._region_count = self._flatten(self.region_codes)
+        self._phone_flat, self._phone_start, self._phone_count = self._flatten(self.phone_codes)
+
+    def _flatten(self, table):
+        arrays = [np.asarray(table[city], dtype=np.int64) for city in self.cities]
+        counts = np.array([len(a) for a in arrays], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        flat = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+        return flat, starts, counts
+
+    def sample_region_codes(self, city_ids, rng):
+        """按城市下标数组批量抽取地区代码"""
+        return self._sample(self._region_flat, self._region_start, self._region_count, city_ids, rng)
+
+    def sample_phone_codes(self, city_ids, rng):
+        """按城市下标数组批量抽取手机号段"""
+        return self._sample(self._phone_flat, self._phone_start, self._phone_count, city_ids, rng)
+
+    @staticmethod
+    def _sample(flat, starts, counts, city_ids, rng):
+        offsets = (rng.random(len(city_ids)) * counts[city_ids]).astype(np.int64)
+        return flat[starts[city_ids] + offsets]
+
+
+# GB11643 校验位：前17位数字与权重的加权和模11后查表
+ID_WEIGHTS = np.array([7,9,10,5,8,4,2,1,6,3,7,9,10,5,8,4,2], dtype=np.int64)
+CHECK_CODES = np.frombuffer(b'10X98765432', dtype=np.uint8)  # 下标为 加权和 % 11
+_POW10 = 10 ** np.arange(16, -1, -1, dtype=np.int64)
+
+
+def calc_check_codes(digits):
+    """digits: (n, 17) 数字矩阵，返回 (n,) 校验位 ASCII 码"""
+    return CHECK_CODES[(digits.astype(np.int64) @ ID_WEIGHTS) % 11]
+
+
+def build_id_numbers(region_codes, birth_dates, genders, rng):
+    """
+    批量生成身份证号
+    参数：
+    region_codes: 6位地区代码数组
+    birth_dates: 出生日期数组（datetime64[D]）
+    genders: 性别数组（1 男 / 0 女）
+    rng: numpy.random.Generator，用于生成顺序码
+    """
+    n = len(region_codes)
+    birth_dates = np.asarray(birth_dates, dtype='datetime64[D]')
+    years = birth_dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    months = birth_dates.astype('datetime64[M]')
+    days = (birth_dates - months).astype(np.int64) + 1
+    months = months.astype(np.int64) % 12 + 1
+    # 顺序码：两位随机数 + 性别奇偶位（男奇女偶）
+    seq_codes = rng.integers(0, 100, size=n) * 10 + rng.integers(0, 5, size=n) * 2 + np.asarray(genders, dtype=np.int64)
+    bodies = (np.asarray(region_codes, dtype=np.int64) * 10**11
+              + (years * 10000 + months * 100 + days) * 1000 + seq_codes)
+    return format_id_numbers(bodies)
+
+
+def format_id_numbers(bodies):
+    """前17位（int64 数组）补上校验位，返回18位身份证号字符串数组"""
+    # 拆成 (n, 17) 数字矩阵，一次算出全部校验位，再整体转成字符串
+    n = len(bodies)
+    digits = np.asarray(bodies, dtype=np.int64)[:, None] // _POW10 % 10
+    chars = np.empty((n, 18), dtype=np.uint8)
+    chars[:, :17] = digits + ord('0')
+    chars[:, 17] = calc_check_codes(digits)
+    return chars.view('S18').ravel().astype('U18')
+
+
+def parse_digits(values, width):
+    """定长数字字符串数组 → (n, width) int64 数字矩阵（比 astype(int) 逐个解析快），非数字字符处的值不在 0–9 内"""
+    values = np.asarray(values, dtype=f'U{width}')
+    return values.view(np.uint32).reshape(len(values), width).astype(np.int64) - ord('0')
+
+
+def digits_value(digits):
+    """(n, width) 数字矩阵 → (n,) int64 整数"""
+    return digits @ 10 ** np.arange(digits.shape[1] - 1, -1, -1, dtype=np.int64)
+
+
+def parse_id_numbers(id_numbers):
+    """
+    批量解析已有的身份证号（与生成时同一套矩阵运算），返回三个等长数组 (格式正确, 前17位, 校验位正确)：
+    格式正确：18位、前17位为数字、末位为数字或 X/x；前17位：int64，格式错误处无意义；
+    校验位正确：末位（x 视同 X）与按前17位算出的校验位一致
+    """
+    values = np.asarray(id_numbers).astype('U')
+    valid = np.char.str_len(values) == 18
+    codes = parse_digits(values, 18)
+    digits = codes[:, :17]
+    valid &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+    last = codes[:, 17] + ord('0')
+    last = np.where(last == ord('x'), ord('X'), last)
+    valid &= ((last >= ord('0')) & (last <= ord('9'))) | (last == ord('X'))
+    digits = np.clip(digits, 0, 9)
+    return valid, digits @ _POW10, last == calc_check_codes(digits)
+
+
+def validate_id_numbers(id_numbers):
+    """批量校验身份证号（18位、前17位为数字、校验位正确），返回布尔数组"""
+    valid, _, check_ok = parse_id_numbers(id_numbers)
+    return valid & check_ok
+
+
+class NamePool:
+    """姓名引擎：按字数拆分 Faker zh_CN 的姓/名表，批量直接抽取姓名"""
+    TABLES = ('last1', 'last2', 'first1', 'first2')  # 单字姓、复姓、单字名、双字名
+
+    def __init__(self, tables):
+        """tables: {表名: (字符串数组, 权重数组)}，表名见 TABLES"""
+        self.tables = {key: (np.asarray(texts, dtype=str), np.asarray(weights, dtype=float)) for key, (texts, weights) in tables.items()}
+        self.samplers = {key: AliasSampler(weights) for key, (_, weights) in self.tables.items()}
+        # 三字名由 单姓+双字名 或 复姓+单字名 组成，两种组合的比例与原先逐个抽取再筛选的结果一致
+        w = {key: weights.sum() for key, (_, weights) in self.tables.items()}
+        single_double = w['last1'] * w['first2']
+        double_single = w['last2'] * w['first1']
+        self.p_single_double = single_double / (single_double + double_single)
+
+    @classmethod
+    def from_faker(cls):
+        """从 Faker zh_CN 姓名表构建（只读取表，不初始化 Faker）"""
+        from faker.providers.person.zh_CN import Provider
+        last_names = Provider.last_names
+        if isinstance(last_names, dict):
+            last_texts, last_weights = list(last_names.keys()), list(last_names.values())
+        else:
+            last_texts, last_weights = list(last_names), [1.0] * len(last_names)
+        first_texts, first_weights = list(Provider.first_names), [1.0] * len(Provider.first_names)
+        tables = {}
+        for prefix, texts, weights in (('last', last_texts, last_weights), ('first', first_texts, first_weights)):
+            for length in (1, 2):
+                picked = [(t, wt) for t, wt in zip(texts, weights) if len(t) == length]
+                tables[f'{prefix}{length}'] = ([t for t, _ in picked], [wt for _, wt in picked])
+        return cls(tables)
+
+    @classmethod
+    def load(cls, cache_path=None):
+        """
+        加载姓名表
+        cache_path: 可选的缓存文件（.npz），存在则直接读取，否则从 Faker 构建后写入
+        """
+        if cache_path and os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                return cls({key: (data[key], data[f'{key}_weights']) for key in cls.TABLES})
+        pool = cls.from_faker()
+        if cache_path:
+            pool.save(cache_path)
+        return pool
+
+    def save(self, path):
+        """将拆分后的姓名表写入缓存文件"""
+        arrays = {}
+        for key, (texts, weights) in self.tables.items():
+            arrays[key] = texts
+            arrays[f'{key}_weights'] = weights
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def _pick(self, key, size, rng):
+        texts, _ = self.tables[key]
+        return texts[self.samplers[key].sample(size, rng)]
+
+    def sample(self, n, rng):
+        """批量生成姓名：80%三字，20%二字"""
+        three = rng.random(n) < 0.8
+        single_double = three & (rng.random(n) < self.p_single_double)
+        double_single = three & ~single_double
+        last = np.empty(n, dtype=object)
+        first = np.empty(n, dtype=object)
+        for mask, last_key, first_key in ((single_double, 'last1', 'first2'),
+                                          (double_single, 'last2', 'first1'),
+                                          (~three, 'last1', 'first1')):
+            count = int(mask.sum())
+            if count:
+                last[mask] = self._pick(last_key, count, rng)
+                first[mask] = self._pick(first_key, count, rng)
+        return last + first
+
+
+def load_events(path, sheet_names=SHEET_NAMES):
+    """
+    读取 events.xlsx 中的各工作表，返回 [(事件数组, AliasSampler), ...]
+    经 refdata 缓存，文件未修改（编辑器未保存新权重）时不重建别名表
+    """
+    def build():
+        sheets = refdata.load_event_sheets(path)
+        return [(sheets[name][0].astype(object), AliasSampler(sheets[name][1])) for name in sheet_names]
+    return refdata.cached(('event_samplers', path, tuple(sheet_names)), [path], build)
+
+
+class RecordEngine:
+    """批量记录生成引擎：每批一次性以数组形式抽取全部字段，返回列式结果"""
+    def __init__(self, city_index, events, names, city_weights=CITY_WEIGHTS, ref_date=None):
+        """
+        参数：
+        city_index: CityIndex
+        events: [(事件数组, AliasSampler 或权重数组), ...]，顺序与工作表一致
+        names: NamePool
+        city_weights: 与 city_index.cities 对应的城市权重
+        ref_date: 计算出生日期的基准时间，默认当前时间（相同种子要得到相同结果需固定此值）
+        """
+        self.city_index = city_index
+        self.names = names
+        self.ref_date = ref_date if ref_date is not None else datetime.now()
+        # 城市与事件的别名表只在构建时生成一次
+        self.city_sampler = AliasSampler(city_weights)
+        self.events = [(np.asarray(texts, dtype=object), sampler if isinstance(sampler, AliasSampler) else AliasSampler(sampler))
+                       for texts, sampler in events]
+        for city, p in zip(city_index.cities, self.city_sampler.p):
+            if p > 0 and len(city_index.region_codes[city]) == 0:
+                raise ValueError(f"No regions found for the city: {city}")
+            if p > 0 and len(city_index.phone_codes[city]) == 0:
+                raise ValueError(f"No phone_code found for the city: {city}")
+
+    def generate(self, sheet_ids, rng, stats=None):
+        """
+        生成一批记录
+        sheet_ids: 每条记录所属工作表下标（决定跟进记录从哪张表抽取）
+        rng: numpy.random.Generator
+        stats: 可选的 RunStats，累计各阶段用时
+        返回：{'姓名', '电话', '基础信息', '跟进记录'} → 等长数组
+        """
+        stats = stats if stats is not None else RunStats()
+        n = len(sheet_ids)
+        with stats.timer('locations'):
+            region_codes, phones = self.sample_locations(n, rng)
+        with stats.timer('ids'):
+            id_numbers = self.sample_id_numbers(region_codes, rng)
+        with stats.timer('names'):
+            names = self.names.sample(n, rng)
+        with stats.timer('events'):
+            events = self.sample_events(sheet_ids, rng)
+        return {
+            '姓名': names,
+            '电话': phones,
+            '基础信息': id_numbers,
+            '跟进记录': events,
+        }
+
+    def sample_locations(self, n, rng):
+        """按城市权重抽取城市，再抽取该市的地区代码与手机号，返回 (地区代码数组, 手机号数组)"""
+        city_ids = self.city_sampler.sample(n, rng)
+        region_codes = self.city_index.sample_region_codes(city_ids, rng)
+        phone_codes = self.city_index.sample_phone_codes(city_ids, rng)
+        phones = (phone_codes * 10000 + rng.integers(1110, 10000, size=n)).astype(str)
+        return region_codes, phones
+
+    def sample_id_numbers(self, region_codes, rng):
+        """按地区代码生成身份证号（性别、年龄随机）"""
+        n = len(region_codes)
+        genders = (rng.random(n) < 0.4).astype(np.int64)  # 1 男 / 0 女，男女比例2:3
+        # 年龄正态分布（均值52.5，标准差13.75），限定在25到80岁之间
+        ages = np.clip(rng.normal(loc=52.5, scale=13.75, size=n), 25, 80)
+        birth_dates = self.birth_dates(ages, rng.integers(0, 365, size=n))
+        return build_id_numbers(region_codes, birth_dates, genders, rng)
+
+    def birth_dates(self, ages, extra_days):
+        """基准时间减去 年龄*365 + 额外天数，返回 datetime64[D] 数组"""
+        ref = np.datetime64(self.ref_date, 'us')
+        offsets = np.round((ages * 365 + extra_days) * 86400e6).astype('timedelta64[us]')
+        return (ref - offsets).astype('datetime64[D]')
+
+    def sample_events(self, sheet_ids, rng):
+        """按工作表分别以权重抽取跟进记录"""
+        result = np.empty(len(sheet_ids), dtype=object)
+        for i, (texts, sampler) in enumerate(self.events):
+            mask = sheet_ids == i
+            count = int(mask.sum())
+            if count:
+                result[mask] = texts[sampler.sample(count, rng)]
+        return result
+
+
+def batch_rng(entropy, index):
+    """第 index 批的独立随机数流，只由主种子和批次序号决定，与进程数无关"""
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(index,)))
+
+
+def _generate_batch(engine, entropy, bounds, index, start, stop, stats=None):
+    sheet_ids = np.searchsorted(bounds, np.arange(start, stop), side='right')
+    return engine.generate(sheet_ids, batch_rng(entropy, index), stats)
+
+
+_worker_engine = None  # 子进程内的引擎
+
+
+def _init_worker(engine):
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _worker_batch(task):
+    stats = RunStats()
+    return _generate_batch(_worker_engine, *task, stats=stats), stats
+
+
+def iter_batches(engine, counts, batch_size=BATCH_SIZE, seed=None, workers=1, stats=None, first_batch=0):
+    """
+    按批生成记录
+    counts: 各工作表（存款/理财/贷款）的记录数，记录按工作表顺序排列
+    seed: 主种子，None 时随机；相同的 种子 + batch_size + 引擎基准时间 得到相同结果
+    workers: 进程数，大于1时各批分发到进程池并行生成，仍按批次顺序返回
+    stats: 可选的 RunStats，累计生成各阶段用时（含子进程）
+    first_batch: 从第几批开始（续传时跳过已完成的批次，之后各批与从头生成时相同）
+    """
+    bounds = np.cumsum(counts)
+    total = int(bounds[-1]) if len(bounds) else 0
+    entropy = np.random.SeedSequence(seed).entropy
+    tasks = ((entropy, bounds, index, start, min(start + batch_size, total))
+             for index, start in enumerate(range(0, total, batch_size)) if index >= first_batch)
+    if workers <= 1:
+        for task in tasks:
+            yield _generate_batch(engine, *task, stats=stats)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine,))
+    pending = deque()  # 最多保留 workers*2 批在途，避免结果堆积
+
+    def result():
+        batch, worker_stats = pending.popleft().result()
+        if stats is not None:
+            stats.merge(worker_stats)
+        return batch
+    try:
+        for task in tasks:
+            pending.append(pool.submit(_worker_batch, task))
+            if len(pending) >= workers * 2:
+                yield result()
+        while pending:
+            yield result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def concat_batches(batches):
+    """合并多批列式结果"""
+    batches = list(batches)
+    if not batches:
+        return {key: np.empty(0, dtype=object) for key in ('姓名', '电话', '基础信息', '跟进记录')}
+    return {key: np.concatenate([batch[key] for batch in batches]) for key in batches[0]}
+
+
+class GenerationCancelled(Exception):
+    """生成过程被取消"""
+
+
+def resource_path(relative_path):
+    """ 获取打包后资源的绝对路径 """
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath("."), relative_path)
+
+
+def load_engine(area_path=None, phone_path=None, events_path=None, ref_date=None, name_cache=None):
+    """
+    读取 area.csv、phone.csv、events.xlsx 并构建生成引擎，路径默认取程序资源目录
+    解析结果、城市索引与姓名表均经 refdata 缓存，文件未变化时重复调用不再解析
+    源文件所在目录有最新快照时直接读取快照（含姓名表，无需加载 Faker）；不写快照，重建见 refdata.py
+    """
+    area_path = area_path or resource_path('area.csv')
+    phone_path = phone_path or resource_path('phone.csv')
+    events_path = events_path or resource_path('events.xlsx')
+    city_index = refdata.cached(('city_index', area_path, phone_path), [area_path, phone_path],
+                                lambda: CityIndex(refdata.load_area(area_path), refdata.load_phone(phone_path), CITIES))
+    snapshot_path = os.path.join(os.path.dirname(os.path.abspath(area_path)), refdata.SNAPSHOT_FILE)
+    snapshot_names = None if name_cache else refdata.load_snapshot_names(os.path.dirname(snapshot_path))
+    if snapshot_names is not None:
+        names = refdata.cached(('names', snapshot_path), [snapshot_path], lambda: NamePool(snapshot_names))
+    else:
+        names = refdata.cached(('names', name_cache), [name_cache] if name_cache and os.path.exists(name_cache) else [],
+                               lambda: NamePool.load(name_cache))
+    return RecordEngine(city_index, load_events(events_path, SHEET_NAMES), names, CITY_WEIGHTS, ref_date)
+
+
+def generate_records(counts, seed=None, batch_size=BATCH_SIZE, workers=1, engine=None):
+    """生成记录并以列式结果返回（全部在内存中，适合小批量调用）"""
+    engine = engine or load_engine()
+    return concat_batches(iter_batches(engine, counts, batch_size, seed, workers))
+
+
+def run_params(counts, fmt, seed, batch_size, engine, writer_options=None, template_path=None, unique=None):
+    """
+    决定输出内容的运行参数（可写入 JSON），续传时须与保存的一致
+    seed 为 SeedSequence 的 entropy（随机种子也先取定再记录），参考数据与模板按内容摘要比较
+    """
+    sources = ['area.csv', 'phone.csv', 'events.xlsx'] + (['电访记录表.xlsx'] if fmt == 'xlsx' and not template_path else [])
+    digests = {name: refdata.file_digest(resource_path(name)) for name in sources}
+    if fmt == 'xlsx' and template_path:
+        digests['template'] = refdata.file_digest(template_path)
+    return {'counts': [int(n) for n in counts], 'format': fmt, 'seed': int(seed), 'batch_size': int(batch_size),
+            'ref_date': engine.ref_date.isoformat(), 'writer_options': dict(writer_options or {}),
+            'template': template_path, 'unique': unique is not None,
+            'unique_state': unique.state_path if unique is not None else None, 'digests': digests}
+
+
+def generate_file(counts, output_path, fmt='xlsx', seed=None, batch_size=BATCH_SIZE, workers=1,
+                  template_path=None, engine=None, on_batch=None, cancel=None, writer_options=None,
+                  stats=None, profile_path=None, unique=None, checkpoint=None):
+    """
+    生成记录并写出文件，返回写入的记录数
+    参数：
+    counts: 各工作表（存款/理财/贷款）的记录数
+    output_path: 输出文件
+    fmt: 输出格式，见 writers.WRITERS
+    template_path: xlsx 模板，默认 电访记录表.xlsx
+    engine: 已构建的 RecordEngine，默认按资源目录读取
+    on_batch: 每写完一批调用 on_batch(batch)（在写入线程中调用）
+    cancel: threading.Event 等带 is_set() 的对象，置位后抛出 GenerationCancelled，不保存输出文件
+    writer_options: 传给写入器的选项，如 {'rows_per_file': 1000000, 'row_group_size': 100000}
+    stats: 可选的 RunStats，记录各阶段用时与记录数、批次数
+    profile_path: 指定时以 cProfile 分析本次生成（当前线程及写入线程），结果写入该文件及同名 .txt
+    unique: 可选的 uniqueness.UniqueNumbers，写入前改写电话与身份证号使其不重复（按批次顺序，结果与进程数无关）；
+            指定了 state_path 时在输出文件保存成功后写回
+    checkpoint: 可选的 checkpoint.Checkpoint，定期保存进度，中断（出错、取消、进程退出）时保留已写的临时文件；
+                其中已有进度时从保存的批次继续（参数须一致），结果与不中断时相同
+    """
+    from writers import open_writer, commit_files, WriterThread
+    stats = stats if stats is not None else RunStats()
+    stats.count('workers', workers)
+    with profiled(profile_path):
+        with stats.timer('load'):
+            engine = engine or load_engine()
+        done_batches, done_records, resumed = 0, 0, None
+        if checkpoint is not None:
+            resumed = checkpoint.load()
+            seed = resumed['params']['seed'] if resumed is not None and seed is None else seed
+            seed = np.random.SeedSequence(seed).entropy  # 随机种子也先取定，记录在进度中
+            params = run_params(counts, fmt, seed, batch_size, engine, writer_options, template_path, unique)
+            if resumed is not None:
+                checkpoint.check(params)
+                if unique is not None:
+                    checkpoint.restore_unique(unique)
+                done_batches, done_records = resumed['batches'], resumed['records']
+                if resumed['files'] is not None:
+                    # 上次已全部写完、只是替换正式文件失败（如文件被占用）：只需再替换一次
+                    with stats.timer('save'):
+                        commit_files(resumed['files'])
+                        if unique is not None and unique.state_path:
+                            unique.save()
+                    checkpoint.clear()
+                    return done_records
+        with stats.timer('open'):
+            writer = open_writer(fmt, output_path, template_path or resource_path('电访记录表.xlsx'),
+                                 checkpoint.directory if checkpoint is not None else None, **(writer_options or {}))
+        if resumed is not None:
+            writer.restore(resumed['writer'])
+        # 当前线程生成（或收集子进程结果），写入线程同时写出上一批，两者之间的队列有界
+        sink = WriterThread(writer, on_written=on_batch, stats=stats)
+        submitted = done_records  # 已交给写入线程的记录数（含续传前已完成的）
+        try:
+            batches = iter_batches(engine, counts, batch_size, seed, workers, stats, done_batches)
+            for index, batch in enumerate(batches, start=done_batches + 1):
+                if cancel is not None and cancel.is_set():
+                    raise GenerationCancelled(f"已生成 {done_records + sink.written} 条后取消")
+                if unique is not None:
+                    with stats.timer('unique'):
+                        unique.apply(batch)
+                sink.put(batch)
+                submitted += len(batch['姓名'])
+                # 只在写入器能从此处续写时才等待写入线程（xlsx 从不，Parquet 只在分片边界），不打断生成与写入的并行
+                if checkpoint is not None and checkpoint.due() and writer.can_checkpoint(submitted):
+                    with stats.timer('checkpoint'):
+                        sink.drain()  # 写入器与号码去重都停在第 index 批之后
+                        writer_state = writer.checkpoint()
+                        if writer_state is not None:
+                            checkpoint.save(params, index, done_records + sink.written, writer_state, unique)
+                        else:
+                            checkpoint.postpone()
+            sink.finish()
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelled(f"已生成 {done_records + sink.written} 条后取消")
+        except BaseException:
+            sink.stop()
+            if checkpoint is not None:
+                writer.suspend()
+            else:
+                writer.abort()
+            raise
+        with stats.timer('save'):
+            if checkpoint is None:
+                writer.close()
+            else:
+                writer.finish()
+                total_batches = -(-sum(counts) // batch_size)
+                checkpoint.save(params, total_batches, done_records + sink.written, None, unique, writer.pending_files())
+                writer.commit()
+            if unique is not None and unique.state_path:
+                unique.save()
+            if checkpoint is not None:
+                checkpoint.clear()  # 号码记录写回之后才删除进度，中途退出时可再次续传
+    return done_records + sink.written
+
+
+def main(argv=None):
+    """命令行入口"""
+    import argparse
+    import time
+    from writers import WRITERS
+    parser = argparse.ArgumentParser(description="电访记录生成器")
+    parser.add_argument('--counts', nargs=3, type=int, default=[0, 0, 0], metavar=tuple(SHEET_NAMES), help="各工作表记录数")
+    parser.add_argument('-o', '--output', required=True, help="输出文件")
+    parser.add_argument('--format', default='xlsx', choices=sorted(WRITERS), help="输出格式（默认 xlsx）")
+    parser.add_argument('--template', help="xlsx 模板（默认 电访记录表.xlsx）")
+    parser.add_argument('--rows-per-file', type=int, help="csv/jsonl/parquet 每个分片文件的记录数（默认不分片）")
+    parser.add_argument('--row-group-size', type=int, help="parquet 行组大小（默认每批一个行组）")
+    parser.add_argument('--seed', type=int, help="随机种子")
+    parser.add_argument('--ref-date', help="出生日期基准日 YYYY-MM-DD，与 --seed 一起使用可完全复现结果")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f"每批记录数（默认 {BATCH_SIZE}）")
+    parser.add_argument('--workers', type=int, default=1, help="生成进程数（默认 1）")
+    parser.add_argument('--unique', action='store_true', help="电话号码与身份证号不重复")
+    parser.add_argument('--unique-state', metavar='PATH', help="已分配号码的记录文件（.npz），跨次运行也不重复（隐含 --unique）")
+    parser.add_argument('--stats', action='store_true', help="结束后打印各阶段用时")
+    parser.add_argument('--profile', metavar='PATH', help="以 cProfile 分析本次生成，结果写入 PATH 及 PATH.txt")
+    parser.add_argument('--checkpoint', action='store_true', help="定期保存进度到 输出文件.checkpoint 目录，中断后可用 --resume 继续")
+    parser.add_argument('--checkpoint-interval', type=float, default=CHECKPOINT_SECONDS, metavar='SECONDS',
+                        help=f"保存进度的间隔秒数（默认 {CHECKPOINT_SECONDS}）")
+    parser.add_argument('--resume', action='store_true', help="从 输出文件.checkpoint 继续中断的运行（记录数、种子等参数取自进度）")
+    args = parser.parse_args(argv)
+
+    ref_date = datetime.strptime(args.ref_date, '%Y-%m-%d') if args.ref_date else None
+    writer_options = {}
+    if args.rows_per_file:
+        writer_options['rows_per_file'] = args.rows_per_file
+    if args.row_group_size:
+        writer_options['row_group_size'] = args.row_group_size
+    checkpoint = None
+    if args.checkpoint or args.resume:
+        checkpoint = Checkpoint(checkpoint_dir(args.output), args.checkpoint_interval)
+        saved = checkpoint.load()
+        if args.resume:
+            if saved is None:
+                parser.error(f"没有可继续的进度：{checkpoint.directory}")
+            params = saved['params']
+            args.counts, args.format, args.seed, args.batch_size = (params['counts'], params['format'],
+                                                                    params['seed'], params['batch_size'])
+            args.template, args.unique, args.unique_state = params['template'], params['unique'], params['unique_state']
+            writer_options = params['writer_options']
+            ref_date = datetime.fromisoformat(params['ref_date'])
+        elif saved is not None:
+            parser.error(f"{checkpoint.directory} 中有未完成的运行，请加 --resume 继续，或删除该目录后重新生成")
+    start = time.perf_counter()
+    stats = RunStats()
+    with profiled(args.profile):
+        with stats.timer('load'):
+            engine = load_engine(ref_date=ref_date)
+        unique = None
+        if args.unique or args.unique_state:
+            from uniqueness import UniqueNumbers
+            unique = UniqueNumbers(engine.city_index, args.seed, args.unique_state)
+        written = generate_file(args.counts, args.output, args.format, args.seed, args.batch_size, args.workers,
+                                args.template, engine, writer_options=writer_options, stats=stats, unique=unique,
+                                checkpoint=checkpoint)
+    print(f"已写入 {written} 条记录：{args.output}（{time.perf_counter() - start:.2f}秒）")
+    if unique is not None:
+        print('\n'.join(unique.report_lines()))
+    if args.stats:
+        print('\n'.join(stats.summary_lines()))
+    if args.profile:
+        print(f"性能分析结果：{args.profile}、{args.profile}.txt")
+
+
+if __name__ == "__main__":
+    main()
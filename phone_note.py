@@ -1,20 +1,373 @@
 # -*- coding: utf-8; py-compile-optimize: 1 -*-
-import random
-import pandas as pd
-import numpy as np
-from faker import Faker
-from datetime import datetime, timedelta
-from openpyxl import load_workbook
+# numpy/pandas/openpyxl/Faker 等较重的模块（generator、refdata、writers）在首次使用时才导入，
+# 窗口显示后由后台线程预先加载，见 FinanceApp.warm_up
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sys
 import os
+import time
+import bisect
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+LOG_MAX_LINES = 2000  # 执行日志最多保留的行数
+LOG_POLL_MS = 100  # 界面刷新进度与日志的间隔（毫秒）
+LOG_FILE = "phone_note.log"  # 完整逐条记录日志（按大小轮转）
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+PROFILE_FILE = "phone_note.prof"  # 性能分析结果（另有同名 .txt 文本报告）
+UNIQUE_STATE_FILE = "phone_note_unique.npz"  # 跨次运行不重复时，已分配的电话与身份证号记录
+
+class EventIndex:
+    """
+    事件搜索索引：事件文本（小写）中的每个单字、相邻两字 → 包含该片段的行 id 集合
+    行 id 不随其他行的增删而变，数据修改时只增删改动行的片段；查询时再换算为当前行号
+    """
+    def __init__(self):
+        self.texts = {}  # 行 id → 小写的事件文本
+        self.grams = {}
+
+    @staticmethod
+    def _grams(text):
+        return set(text) | {text[j:j + 2] for j in range(len(text) - 1)}
+
+    def add(self, row_id, event):
+        text = event.lower()
+        self.texts[row_id] = text
+        for gram in self._grams(text):
+            self.grams.setdefault(gram, set()).add(row_id)
+
+    def remove(self, row_id):
+        for gram in self._grams(self.texts.pop(row_id)):
+            ids = self.grams[gram]
+            ids.discard(row_id)
+            if not ids:
+                del self.grams[gram]
+
+    def search(self, text, positions, start, stop):
+        """
+        事件包含 text 中每个（以空格分隔的）词、且行号在 [start, stop) 内的行号（升序）
+        positions: 行 id → 当前行号；只扫描最短的片段 id 集合，再逐行确认包含全部词
+        """
+        terms = text.lower().split()
+        if not terms:
+            return list(range(start, stop))
+        postings = []
+        for term in terms:
+            for gram in {term[j:j + 2] for j in range(len(term) - 1)} or {term}:
+                if gram not in self.grams:
+                    return []
+                postings.append(self.grams[gram])
+        texts = self.texts
+        return sorted(positions[row_id] for row_id in min(postings, key=len)
+                      if start <= positions[row_id] < stop and all(term in texts[row_id] for term in terms))
+
+
+class VirtualTable:
+    """
+    虚拟化事件表格：数据按权重降序保存在内存列表中，Treeview 只保留可见的若干行，
+    滚动时改写这些行的内容；增删改用二分查找定位插入位置，只刷新可见区域
+    搜索/权重筛选时只显示 EventIndex 查得的行（view）；每行有不变的 id（ids 与 rows 一一对应），
+    数据修改时索引只更新改动的行；文件中原有的行以其在文件中的顺序为 id，保存时按 id 找到文件中的行
+    """
+    ROW_HEIGHT = 20  # 量出实际值之前使用的行高与表头高度（像素）
+    HEADER_HEIGHT = 25
+
+    def __init__(self, parent, rows):
+        """rows: [(事件, 权重), ...]，顺序与文件一致"""
+        order = sorted(range(len(rows)), key=lambda i: -rows[i][1])  # 稳定排序，同权重保持原顺序
+        self.rows = [rows[i] for i in order]
+        self.ids = order  # 各行的 id，插入的行取新 id
+        self.next_id = len(rows)
+        self.saved_rows = dict(enumerate(rows))  # 上次保存时文件中的行 {id: (事件, 权重)}
+        self.file_ids = list(range(len(rows)))  # 文件中各行（第2行起）的 id
+        self.modified = False  # 保存后是否有修改
+        self.offset = 0  # 第一个可见行在 显示的行 中的下标
+        self.page_size = 20  # 可见行数，随窗口大小调整
+        self.height = None  # Treeview 的高度（像素）
+        self.row_height = self.ROW_HEIGHT  # 实际的行高与表头高度，随主题、字体与 DPI 缩放变化，见 measure()
+        self.header_height = self.HEADER_HEIGHT
+        self.query = ('', None, None)  # (搜索文本, 最小权重, 最大权重)
+        self.index = None  # EventIndex，首次搜索时构建
+        self.positions = None  # 行 id → 行号，数据修改后在下次搜索时重建
+        self.view = None  # 筛选后显示的 rows 下标列表；None 表示显示全部
+        self.selected = set()  # 选中行的 id（Treeview 的行随滚动复用，选择按 id 记录，render() 时重新标出）
+        self.cursor = None  # 键盘移动的当前行 id
+        self.anchor = None  # Shift 连选的起点行 id
+        self.page_ids = []  # 可见各行的 id
+
+        self.tree = ttk.Treeview(parent, columns=("事件", "权重"), show='headings')
+        self.tree.heading("事件", text="事件")
+        self.tree.heading("权重", text="权重")
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scroll)
+
+        # 布局
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        # 上下键与翻页键移动选择，越过可见区域时滚动（默认的 Treeview 按键只在可见行中移动）
+        for key, rows in (("Up", -1), ("Down", 1)):
+            self.tree.bind(f"<{key}>", lambda e, rows=rows: self.move_cursor(rows))
+            self.tree.bind(f"<Shift-{key}>", lambda e, rows=rows: self.move_cursor(rows, extend=True))
+        for key, pages in (("Prior", -1), ("Next", 1)):
+            self.tree.bind(f"<{key}>", lambda e, pages=pages: self.move_cursor(pages * self.page_size))
+            self.tree.bind(f"<Shift-{key}>", lambda e, pages=pages: self.move_cursor(pages * self.page_size, extend=True))
+        self.render()
+
+    @staticmethod
+    def format_weight(weight):
+        return f"{weight:g}"
+
+    def on_resize(self, event):
+        self.height = event.height
+        self.update_page_size()
+
+    def measure(self):
+        """
+        量出实际的行高与表头高度：有已显示的行时取第一行的位置与高度，否则取样式中设置的行高
+        返回是否量到了已显示的行
+        """
+        items = self.tree.get_children()
+        bbox = self.tree.bbox(items[0]) if items else ''
+        if bbox:
+            self.header_height, self.row_height = bbox[1], bbox[3]
+            return True
+        row_height = ttk.Style(self.tree).lookup(self.tree.cget('style') or 'Treeview', 'rowheight')
+        if row_height:
+            self.row_height = int(float(row_height))
+        return False
+
+    def update_page_size(self, retry=True):
+        """按 Treeview 高度与实际行高计算可见行数"""
+        if self.height is None:
+            return
+        measured = self.measure()
+        page_size = max(1, (self.height - self.header_height) // self.row_height)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.render()
+        if not measured and retry and self.tree.get_children():
+            # 行的位置在 Treeview 下次重绘时才更新，重绘后再量一次
+            self.tree.after_idle(self.update_page_size, False)
+
+    def row_count(self):
+        """显示的行数"""
+        return len(self.rows) if self.view is None else len(self.view)
+
+    def filter(self, text='', min_weight=None, max_weight=None):
+        """按事件文本与权重区间筛选显示的行，回到第一行"""
+        self.query = (text, min_weight, max_weight)
+        self.offset = 0
+        self.selected = set()
+        self.cursor = self.anchor = None
+        self.apply_filter()
+        self.render()
+
+    def apply_filter(self):
+        text, min_weight, max_weight = self.query
+        if not text.strip() and min_weight is None and max_weight is None:
+            self.view = None
+            return
+        if self.index is None:
+            self.index = EventIndex()
+            for row_id, (event, _) in zip(self.ids, self.rows):
+                self.index.add(row_id, event)
+        if self.positions is None:
+            self.positions = {row_id: i for i, row_id in enumerate(self.ids)}
+        start, stop = self.weight_range(min_weight, max_weight)
+        self.view = self.index.search(text, self.positions, start, stop)
+
+    def weight_range(self, min_weight=None, max_weight=None):
+        """权重在 [min_weight, max_weight] 内的行号范围 (start, stop)，rows 按权重降序"""
+        start = 0 if max_weight is None else bisect.bisect_left(self.rows, -max_weight, key=lambda row: -row[1])
+        stop = len(self.rows) if min_weight is None else bisect.bisect_right(self.rows, -min_weight, key=lambda row: -row[1])
+        return start, max(start, stop)
+
+    def on_scroll(self, *args):
+        """滚动条回调：('moveto', 比例) 或 ('scroll', 步数, 'units'/'pages')"""
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * self.row_count())
+        elif args[0] == 'scroll':
+            self.offset += int(args[1]) * (self.page_size if args[2] == 'pages' else 1)
+        self.render()
+
+    def scroll_by(self, rows):
+        self.offset += rows
+        self.render()
+        return "break"
+
+    def render(self):
+        """只把可见区域的行写入 Treeview"""
+        count = self.row_count()
+        self.offset = max(0, min(self.offset, count - self.page_size))
+        if self.view is None:
+            indices = range(self.offset, min(count, self.offset + self.page_size))
+        else:
+            indices = self.view[self.offset:self.offset + self.page_size]
+        page = [self.rows[i] for i in indices]
+        self.page_ids = [self.ids[i] for i in indices]
+        items = list(self.tree.get_children())
+        if len(items) > len(page):
+            self.tree.delete(*items[len(page):])
+            del items[len(page):]
+        while len(items) < len(page):
+            items.append(self.tree.insert("", tk.END))
+        for item, (event, weight) in zip(items, page):
+            self.tree.item(item, values=(event, self.format_weight(weight)))
+        # 选择与焦点跟随数据行，而不是停留在复用的 Treeview 行上
+        self.tree.selection_set([item for item, row_id in zip(items, self.page_ids) if row_id in self.selected])
+        for item, row_id in zip(items, self.page_ids):
+            if row_id == self.cursor:
+                self.tree.focus(item)
+        if count:
+            self.scrollbar.set(self.offset / count, (self.offset + len(page)) / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def on_select(self, event):
+        """鼠标在可见行中改变了选择：以可见行中的选择为准（render() 重新标出选择时也会触发，此时不变）"""
+        chosen = {self.page_ids[self.tree.index(item)] for item in self.tree.selection()}
+        if chosen == self.selected & set(self.page_ids):
+            return
+        self.selected = chosen
+        focus = self.tree.focus()
+        if focus:
+            self.cursor = self.anchor = self.page_ids[self.tree.index(focus)]
+
+    def display_position(self, row_id):
+        """行 id 在显示的行中的位置，不显示时返回 None"""
+        if row_id is None or row_id not in self.ids:
+            return None
+        index = self.ids.index(row_id)
+        if self.view is None:
+            return index
+        position = bisect.bisect_left(self.view, index)
+        return position if position < len(self.view) and self.view[position] == index else None
+
+    def display_id(self, position):
+        """显示的第 position 行的 id"""
+        return self.ids[position if self.view is None else self.view[position]]
+
+    def move_cursor(self, rows, extend=False):
+        """键盘移动当前行（可越过可见区域，窗口随之滚动）；extend 时选中从起点到当前行的所有行"""
+        count = self.row_count()
+        if not count:
+            return "break"
+        position = self.display_position(self.cursor)
+        position = self.offset if position is None else max(0, min(count - 1, position + rows))
+        self.cursor = self.display_id(position)
+        anchor = self.display_position(self.anchor) if extend else None
+        if anchor is None:
+            self.anchor = self.cursor
+            self.selected = {self.cursor}
+        else:
+            self.selected = {self.display_id(i) for i in range(min(anchor, position), max(anchor, position) + 1)}
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + self.page_size:
+            self.offset = position - self.page_size + 1
+        self.render()
+        return "break"
+
+    def selected_indices(self):
+        """选中行的 rows 下标（含已滚出可见区域的行）"""
+        return [i for i, row_id in enumerate(self.ids) if row_id in self.selected]
+
+    def index_of(self, item):
+        """Treeview 行 → rows 下标"""
+        position = self.offset + self.tree.index(item)
+        return position if self.view is None else self.view[position]
+
+    def changed(self):
+        """数据修改后：标记未保存、重新筛选并刷新"""
+        self.modified = True
+        self.positions = None
+        self.apply_filter()
+        self.render()
+
+    def _index_row(self, row_id, event):
+        if self.index is not None:
+            self.index.add(row_id, event)
+
+    def _unindex_row(self, row_id):
+        if self.index is not None:
+            self.index.remove(row_id)
+
+    def _insert_row(self, row_id, event, weight):
+        """二分查找插入位置，保持权重降序"""
+        position = bisect.bisect_right(self.rows, -weight, key=lambda row: -row[1])
+        self.rows.insert(position, (event, weight))
+        self.ids.insert(position, row_id)
+        return position
+
+    def insert(self, event, weight):
+        row_id = self.next_id
+        self.next_id += 1
+        position = self._insert_row(row_id, event, weight)
+        self._index_row(row_id, event)
+        self.changed()
+        return position
+
+    def update(self, index, event, weight):
+        """修改一行；权重变化时重新定位"""
+        row_id, (old_event, old_weight) = self.ids[index], self.rows[index]
+        if event != old_event:
+            self._unindex_row(row_id)
+            self._index_row(row_id, event)
+        if weight == old_weight:
+            self.rows[index] = (event, weight)
+        else:
+            del self.rows[index]
+            del self.ids[index]
+            index = self._insert_row(row_id, event, weight)
+        self.changed()
+        return index
+
+    def delete(self, indices):
+        for index in sorted(indices, reverse=True):
+            self._unindex_row(self.ids[index])
+            self.selected.discard(self.ids[index])
+            del self.rows[index]
+            del self.ids[index]
+        self.changed()
+
+    def changes(self):
+        """
+        与上次保存相比的修改，按文件中的行号（第1行为表头）：
+        (修改的行 {行号: (事件, 权重)}, 删除的行号集合, 新增的行 [(事件, 权重)]（按添加顺序追加在末尾）)
+        """
+        current = dict(zip(self.ids, self.rows))
+        edited, deleted = {}, set()
+        for line, row_id in enumerate(self.file_ids, start=2):
+            row = current.get(row_id)
+            if row is None:
+                deleted.add(line)
+            elif row != self.saved_rows[row_id]:
+                edited[line] = row
+        added = [current[row_id] for row_id in sorted(current.keys() - self.saved_rows.keys())]
+        return edited, deleted, added
+
+    def mark_saved(self):
+        """changes() 已写入文件：删除的行之后的行上移，新增的行追加在末尾"""
+        current = dict(zip(self.ids, self.rows))
+        self.file_ids = ([row_id for row_id in self.file_ids if row_id in current]
+                         + sorted(current.keys() - self.saved_rows.keys()))
+        self.saved_rows = current
+        self.modified = False
+
 
 class ExcelEditor:
     def __init__(self, master):
         self.master = master
-        self.data = {}  # 存储所有工作表数据 {sheet_name: DataFrame}
-        self.treeviews = {}  # 存储Treeview组件
+        self.tables = {}  # 存储所有工作表数据 {sheet_name: VirtualTable}
         
         # 初始化界面
         self.create_ui()
@@ -39,105 +392,92 @@ class ExcelEditor:
         
         tip_label = ttk.Label(
             tip_frame,
-            text="操作提示：双击表格修改数据，修改后点击【保存修改】按钮",
+            text="操作提示：双击表格修改数据，修改后点击【保存修改】按钮；输入关键字或权重范围可筛选",
             style="Tip.TLabel"
         )
         tip_label.pack(side=tk.LEFT, padx=10)
 
+        # 搜索与权重筛选（输入即刷新，对所有页签生效）
+        search_frame = ttk.Frame(self.master)
+        search_frame.pack(fill=tk.X, padx=20, pady=3)
+        self.search_var = tk.StringVar()
+        self.min_weight_var = tk.StringVar()
+        self.max_weight_var = tk.StringVar()
+        self.count_var = tk.StringVar()
+        ttk.Label(search_frame, text="搜索：").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_var, width=24).pack(side=tk.LEFT)
+        ttk.Label(search_frame, text="  权重：").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.min_weight_var, width=6).pack(side=tk.LEFT)
+        ttk.Label(search_frame, text="–").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.max_weight_var, width=6).pack(side=tk.LEFT)
+        ttk.Label(search_frame, textvariable=self.count_var, style="Tip.TLabel").pack(side=tk.RIGHT)
+        for var in (self.search_var, self.min_weight_var, self.max_weight_var):
+            var.trace_add('write', lambda *args: self.apply_search())
+
         # 页签容器
         self.notebook = ttk.Notebook(self.master)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.update_count())
 
     def load_data(self):
         """加载并排序数据"""
+        import refdata
+        from generator import resource_path
         try:
-            with pd.ExcelFile(resource_path('events.xlsx')) as xls:
-                for sheet_name in xls.sheet_names:
-                    df = xls.parse(sheet_name)
-                    # 按权重降序排序
-                    self.data[sheet_name] = df.sort_values(by='权重', ascending=False)
-                    self.create_sheet_tab(sheet_name)
+            # 与生成器共用参考数据缓存，文件未修改时不再重新解析
+            for sheet_name, (events, weights) in refdata.load_event_sheets(resource_path('events.xlsx')).items():
+                self.create_sheet_tab(sheet_name, list(zip(events.tolist(), weights.tolist())))
+            self.update_count()
         except Exception as e:
             messagebox.showerror("错误", f"读取文件失败：{str(e)}")
 
-    def create_sheet_tab(self, sheet_name):
-        """创建排序后的页签"""
-        frame = ttk.Frame(self.notebook)
-        self.notebook.add(frame, text=sheet_name)
-        
-        tree = ttk.Treeview(frame, columns=("事件", "权重"), show='headings')
-        tree.heading("事件", text="事件")
-        tree.heading("权重", text="权重", command=lambda: self.sort_column(tree, "权重", False))
-        
-        # 配置列...
-        
-        # 插入排序后的数据
-        for _, row in self.data[sheet_name].iterrows():
-            tree.insert("", tk.END, values=tuple(row))
-        
-        self.treeviews[sheet_name] = tree
-
-    def sort_column(self, tree, col, reverse):
-        """动态排序列"""
-        data = [(tree.set(child, col), child) for child in tree.get_children('')]
-        data.sort(reverse=reverse, key=lambda x: float(x[0]) if col == "权重" else x[0])
-        
-        for index, (_, child) in enumerate(data):
-            tree.move(child, '', index)
-        
-        tree.heading(col, command=lambda: self.sort_column(tree, col, not reverse))
-
-    def update_sheet_data(self, sheet_name, tree):
-        """更新数据并保持排序"""
-        items = tree.get_children()
-        data = [tree.item(item, "values") for item in items]
-        
-        # 转换为DataFrame并排序
-        df = pd.DataFrame(data, columns=["事件", "权重"])
-        df["权重"] = df["权重"].astype(float)
-        self.data[sheet_name] = df.sort_values(by='权重', ascending=False)
-        
-        # 刷新显示
-        self.refresh_treeview(sheet_name)
-
-    def refresh_treeview(self, sheet_name):
-        """刷新树形视图显示"""
-        tree = self.treeviews[sheet_name]
-        tree.delete(*tree.get_children())
-        
-        for _, row in self.data[sheet_name].iterrows():
-            tree.insert("", tk.END, values=tuple(row))
-
-    def create_sheet_tab(self, sheet_name):
+    def create_sheet_tab(self, sheet_name, rows):
         """创建单个工作表页签"""
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text=sheet_name)
         
-        # 创建Treeview
-        tree = ttk.Treeview(frame, columns=("事件", "权重"), show='headings')
-        tree.heading("事件", text="事件")
-        tree.heading("权重", text="权重")
-        
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
-        
-        # 布局
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # 虚拟化表格（按权重降序）
+        table = VirtualTable(frame, rows)
         
         # 绑定双击事件
-        tree.bind("<Double-1>", self.on_cell_edit)
-        
-        # 填充数据
-        for _, row in self.data[sheet_name].iterrows():
-            tree.insert("", tk.END, values=tuple(row))
+        table.tree.bind("<Double-1>", self.on_cell_edit)
         
-        self.treeviews[sheet_name] = tree
+        self.tables[sheet_name] = table
+
+    def current_table(self):
+        """当前页签的表格"""
+        return self.tables[self.notebook.tab(self.notebook.select(), "text")]
+
+    @staticmethod
+    def parse_weight(text):
+        """权重筛选框的值，空或无效时不限制"""
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+    def apply_search(self):
+        """按搜索框与权重区间筛选所有页签"""
+        query = (self.search_var.get(), self.parse_weight(self.min_weight_var.get()),
+                 self.parse_weight(self.max_weight_var.get()))
+        for table in self.tables.values():
+            table.filter(*query)
+        self.update_count()
+
+    def update_count(self):
+        """显示当前页签的（筛选后）行数"""
+        if not self.tables:
+            return
+        table = self.current_table()
+        if table.view is None:
+            self.count_var.set(f"共 {len(table.rows)} 条")
+        else:
+            self.count_var.set(f"找到 {len(table.view)} / {len(table.rows)} 条")
 
     def on_cell_edit(self, event):
         """修复索引越界问题的编辑方法"""
         tree = event.widget
+        table = self.current_table()
         
         # 获取点击位置信息
         region = tree.identify_region(event.x, event.y)
@@ -155,7 +495,8 @@ class ExcelEditor:
         
         # 安全获取当前值
         try:
-            current_values = list(tree.item(item, "values"))
+            index = table.index_of(item)
+            current_values = list(table.rows[index])
             if len(current_values) != 2:
                 raise ValueError("数据格式错误")
         except Exception as e:
@@ -182,22 +523,18 @@ class ExcelEditor:
                     validation_passed = False
             else:  # 权重列
                 try:
-                    float_value = float(new_value)
-                    if float_value < 0:
+                    new_value = round(float(new_value), 2)  # 保留两位小数
+                    if new_value < 0:
                         raise ValueError
-                    new_value = f"{float_value:.2f}"  # 格式化保留两位小数
                 except ValueError:
                     messagebox.showerror("错误", "请输入有效的非负数字")
                     validation_passed = False
             
             if validation_passed:
-                # 更新数据
+                # 只更新这一行，并按权重重新定位
                 current_values[col_idx] = new_value
-                tree.item(item, values=current_values)
-                
-                # 更新内存数据
-                sheet_name = self.notebook.tab(self.notebook.select(), "text")
-                self.update_sheet_data(sheet_name, tree)
+                table.update(index, *current_values)
+                self.update_count()
             
             entry.destroy()
         
@@ -237,38 +574,43 @@ class ExcelEditor:
                 messagebox.showerror("错误", "请输入有效的非负数值")
                 return
             
-            # 获取当前页签
-            sheet_name = self.notebook.tab(self.notebook.select(), "text")
-            tree = self.treeviews[sheet_name]
-            
-            # 添加记录
-            tree.insert("", tk.END, values=(event, weight))
-            self.update_sheet_data(sheet_name, tree)
+            # 添加记录到当前页签
+            self.current_table().insert(event, weight)
+            self.update_count()
             dialog.destroy()
         
         ttk.Button(dialog, text="添加", command=add_record).grid(row=2, columnspan=2, pady=5)
 
     def delete_selected(self):
         """删除选中记录"""
-        sheet_name = self.notebook.tab(self.notebook.select(), "text")
-        tree = self.treeviews[sheet_name]
+        table = self.current_table()
         
-        selected = tree.selection()
+        selected = table.selected_indices()
         if not selected:
             messagebox.showwarning("警告", "请先选择要删除的记录")
             return
         
-        for item in selected:
-            tree.delete(item)
-        
-        self.update_sheet_data(sheet_name, tree)
+        table.delete(selected)
+        self.update_count()
+
+    def has_changes(self):
+        """是否有未保存的修改"""
+        return any(table.modified for table in self.tables.values())
 
     def save_data(self):
-        """保存数据到Excel文件"""
+        """保存数据到Excel文件：只改写有修改的工作表中修改、删除、新增的行，并通过临时文件整体替换"""
+        dirty = {sheet_name: table for sheet_name, table in self.tables.items() if table.modified}
+        if not dirty:
+            messagebox.showinfo("提示", "没有需要保存的修改")
+            self.keep_window_top()
+            return
         try:
-            with pd.ExcelWriter(resource_path('events.xlsx'), engine='openpyxl') as writer:
-                for sheet_name, df in self.data.items():
-                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+            from generator import resource_path
+            from writers import patch_sheet_rows
+            patch_sheet_rows(resource_path('events.xlsx'),
+                             {sheet_name: table.changes() for sheet_name, table in dirty.items()})
+            for table in dirty.values():
+                table.mark_saved()
             messagebox.showinfo("成功", "数据保存成功")
             self.keep_window_top()
         except Exception as e:
@@ -282,33 +624,131 @@ class ExcelEditor:
             self.master.after(100, lambda: self.master.attributes('-topmost', False))  # 恢复正常状态
 
 
-class RedirectText:
-    """重定向标准输出到文本组件"""
-    def __init__(self, text_widget):
+class LogSink:
+    """
+    执行日志：待显示的行放在有上限的环形缓冲中，定时合并成一次插入文本框，
+    文本框只保留最近 max_lines 行；可选写入轮转日志文件保存完整的逐条记录。
+    可替代 sys.stdout，任意线程均可写入。
+    """
+    DETAIL = logging.DEBUG  # 逐条记录
+    SUMMARY = logging.INFO  # 汇总信息
+
+    def __init__(self, text_widget, max_lines=LOG_MAX_LINES, level=SUMMARY, flush_ms=LOG_POLL_MS):
         self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.level = level
+        self.flush_ms = flush_ms
+        self.pending = deque(maxlen=max_lines)  # 尚未显示的行，超出上限时丢弃最早的
+        self.dropped = 0  # 因缓冲已满未能显示的行数
+        self.lock = threading.Lock()
+        self.partial = ''  # write() 收到的不完整行
+        self.file_logger = None
+        self.text_widget.after(self.flush_ms, self.flush_timer)
+
+    def set_log_file(self, path):
+        """开启（传入路径）或关闭（传入 None）日志文件"""
+        if self.file_logger is not None:
+            for handler in self.file_logger.handlers[:]:
+                handler.close()
+                self.file_logger.removeHandler(handler)
+            self.file_logger = None
+        if path:
+            handler = RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.file_logger = logging.getLogger('phone_note.records')
+            self.file_logger.propagate = False
+            self.file_logger.setLevel(self.DETAIL)
+            self.file_logger.addHandler(handler)
+
+    def enabled(self, level):
+        """该级别的日志是否需要输出（界面或文件），用于跳过不必要的格式化"""
+        return level >= self.level or self.file_logger is not None
+
+    def log_lines(self, lines, level=SUMMARY):
+        """写入多行日志；写文件时整批合并为一次写入"""
+        lines = list(lines)
+        if not lines:
+            return
+        if self.file_logger is not None:
+            self.file_logger.log(level, '\n'.join(lines))
+        if level < self.level:
+            return
+        with self.lock:
+            self.dropped += max(0, len(self.pending) + len(lines) - self.max_lines)
+            self.pending.extend(lines)
+
+    def log(self, message, level=SUMMARY):
+        self.log_lines([message], level)
+
+    def take_dropped(self):
+        """返回并清零未显示的行数"""
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
 
     def write(self, string):
-        self.text_widget.insert(tk.END, string)
-        self.text_widget.see(tk.END)  # 自动滚动到底部
+        with self.lock:
+            string = self.partial + string
+            *lines, self.partial = string.split('\n')
+        if lines:
+            self.log_lines(lines)
 
     def flush(self):
         pass
 
+    def flush_timer(self):
+        """主线程定时：把缓冲中的行一次性插入文本框，并裁掉超出上限的旧行"""
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+        if lines:
+            self.text_widget.insert(tk.END, '\n'.join(lines) + '\n')
+            line_count = int(self.text_widget.index('end-1c').split('.')[0]) - 1
+            if line_count > self.max_lines:
+                self.text_widget.delete('1.0', f'{line_count - self.max_lines + 1}.0')
+            self.text_widget.see(tk.END)  # 自动滚动到底部
+        self.text_widget.after(self.flush_ms, self.flush_timer)
+
 class FinanceApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("电访记录生成器")
-        self.geometry("600x300")
+        self.geometry("680x370")
         self.resizable(True, True)
         self.record_counts = []  # 存储记录数量的数组
         self.editor_window = None  # 新增窗口引用
+        self.worker = None  # 后台生成线程
+        self.cancel_event = threading.Event()
+        self.progress = {'done': 0, 'total': 0, 'start': 0.0}
         # self.create_ui()
         
         # 创建界面组件
         self.create_widgets()
         
         # 重定向标准输出
-        sys.stdout = RedirectText(self.output_text)
+        self.log_sink = LogSink(self.output_text)
+        self.update_log_settings()
+        sys.stdout = self.log_sink
+
+        # 窗口显示后再在后台预加载生成所需的模块与参考数据
+        self.warm_thread = None
+        self.bind('<Map>', self.start_warm_up, add='+')
+
+    def start_warm_up(self, event=None):
+        """首次显示窗口时启动后台预加载线程"""
+        if self.warm_thread is None:
+            self.warm_thread = threading.Thread(target=self.warm_up, daemon=True)
+            self.warm_thread.start()
+
+    @staticmethod
+    def warm_up():
+        """后台线程：导入 generator/writers 并加载生成引擎（参考数据、姓名表），缩短首次生成的等待"""
+        try:
+            import generator
+            import writers  # 导入 openpyxl
+            generator.load_engine()
+        except Exception:
+            pass  # 预加载失败不影响使用，生成时会重新加载并报告错误
 
     def create_widgets(self):
         # 主容器
@@ -328,14 +768,37 @@ class FinanceApp(tk.Tk):
             entry = ttk.Entry(row)
             entry.pack(side=tk.RIGHT, expand=True, fill=tk.X)
             self.entries.append(entry)
+        option_row = ttk.Frame(input_frame)
+        option_row.pack(fill=tk.X, pady=3)
+        self.unique_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(option_row, text="电话与身份证号不重复", variable=self.unique_var).pack(side=tk.LEFT)
+        self.unique_persist_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(option_row, text="跨次运行也不重复", variable=self.unique_persist_var).pack(side=tk.LEFT, padx=10)
 
         # 按钮区
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(fill=tk.X, pady=5)
         
         ttk.Button(btn_frame, text="事件列表", command=self.show_editor).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="生成记录", command=self.create_fakedata).pack(side=tk.LEFT, padx=5)
+        self.generate_button = ttk.Button(btn_frame, text="生成记录", command=self.create_fakedata)
+        self.generate_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(btn_frame, text="取消", command=self.cancel_generation, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="打开记录", command=self.open_excel).pack(side=tk.RIGHT, padx=5)
+        self.detail_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(btn_frame, text="显示逐条记录", variable=self.detail_var, command=self.update_log_settings).pack(side=tk.RIGHT, padx=5)
+        self.log_file_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="写入日志文件", variable=self.log_file_var, command=self.update_log_settings).pack(side=tk.RIGHT, padx=5)
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="性能分析", variable=self.profile_var).pack(side=tk.RIGHT, padx=5)
+
+        # 进度区
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.pack(fill=tk.X, pady=3)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.progress_label = ttk.Label(progress_frame, text="", width=30)
+        self.progress_label.pack(side=tk.RIGHT)
 
         # 输出区
         output_frame = ttk.LabelFrame(main_frame, text="执行日志", padding=6)
@@ -351,6 +814,11 @@ class FinanceApp(tk.Tk):
         # 编辑器容器
         self.editor = None
 
+    def update_log_settings(self):
+        """根据勾选项切换日志级别与日志文件"""
+        self.log_sink.level = LogSink.DETAIL if self.detail_var.get() else LogSink.SUMMARY
+        self.log_sink.set_log_file(os.path.join(os.path.abspath("."), LOG_FILE) if self.log_file_var.get() else None)
+
     def show_editor(self):
         """显示数据编辑器"""
         # 关闭已存在的编辑器窗口
@@ -360,7 +828,7 @@ class FinanceApp(tk.Tk):
         # 创建新窗口
         self.editor_window = tk.Toplevel(self)
         self.editor_window.title("事件数据编辑")
-        self.editor_window.geometry("600x400")
+        self.editor_window.geometry("600x430")
 
         # 设置窗口关系
         self.editor_window.transient(self)  # 设置为父窗口的临时窗口
@@ -370,16 +838,19 @@ class FinanceApp(tk.Tk):
         self.editor_window.protocol("WM_DELETE_WINDOW", self.close_editor)
         
         # 初始化编辑器
-        ExcelEditor(self.editor_window)
+        self.editor = ExcelEditor(self.editor_window)
 
     def close_editor(self):
-        """安全关闭编辑器"""
-        if messagebox.askokcancel("关闭", "确定要关闭编辑器吗？未保存的修改将会丢失"):
+        """安全关闭编辑器（有未保存的修改时先确认）"""
+        if not self.editor.has_changes() or messagebox.askokcancel("关闭", "确定要关闭编辑器吗？未保存的修改将会丢失"):
             self.editor_window.destroy()
             self.editor_window = None
+            self.editor = None
 
     def create_fakedata(self):
-        """执行生成操作"""
+        """执行生成操作（在后台线程中生成，界面定时刷新进度与日志）"""
+        if self.worker is not None and self.worker.is_alive():
+            return
         self.record_counts = []
         for entry in self.entries:
             try:
@@ -390,173 +861,119 @@ class FinanceApp(tk.Tk):
             except ValueError:
                 value = 0
             self.record_counts.append(value)
-        def generate_fake_data(num_entries):
-            # 生成符合规则的虚拟身份证号码
-            def generate_id_number(region_code, gender,num = 1):
-                """
-                参数：
-                region_code: 前6位地区代码（字符串）
-                gender: 性别（'男'/'女' 或 1/0）
-                num: 生成数量
-                """
-                def calc_check_code(first_17):
-                    # 计算校验码
-                    weight = [7,9,10,5,8,4,2,1,6,3,7,9,10,5,8,4,2]
-                    check_code_map = {0:'1',1:'0',2:'X',3:'9',4:'8',5:'7',6:'6',7:'5',8:'4',9:'3',10:'2'}
-                    total = sum(int(n) * weight[i] for i, n in enumerate(first_17))
-                    return check_code_map[total % 11]
-
-                # 验证参数
-                if len(str(region_code)) != 6 or not str(region_code).isdigit():
-                    raise ValueError("无效的地区代码")          
-                if isinstance(gender, str):
-                    gender = 1 if gender in ['男', 'male'] else 0
-                elif gender not in [0, 1]:
-                    raise ValueError("性别参数错误")
-
-                # 生成年龄的正态分布（均值52.5，标准差13.75）
-                ages = np.clip(np.random.normal(loc=52.5, scale=13.75, size=num), 25, 80)       
-                id_numbers = []
-                for age in ages:
-                    # 生成出生日期
-                    birth_date = datetime.now() - timedelta(days=age*365 + random.randint(0,364))           
-                    # 生成顺序码（3位）
-                    seq_code = f"{random.randint(0,99):02d}"
-                    seq_code += str(random.randrange(1 if gender else 0, 10, 2))           
-                    # 组合前17位
-                    first_17 = f"{region_code}{birth_date.strftime('%Y%m%d')}{seq_code}"           
-                    # 计算校验码
-                    check_code = calc_check_code(first_17)           
-                    id_numbers.append(first_17 + check_code)
-                return id_numbers if num > 1 else id_numbers[0]
-            fake_data = []
-            
-            for _ in range(num_entries):
-                # 根据权重随机选择一个市
-                chosen_city = np.random.choice(cities, p = list(map(lambda x: x / sum(city_weights), city_weights)))  
-                # 筛选出包含所选市的区域名称的行
-                chosen_city_df = df[df['region_name'].str.contains(chosen_city)]
-                # 如果找到了包含所选市的行，则从中随机选择一行输出
-                if not chosen_city_df.empty:
-                    chosen_row = chosen_city_df.sample()
-                    region_code = chosen_row['region_code'].values[0]
-                    #region_name = chosen_row['region_name'].values[0]
-                else:
-                    print(f"No regions found for the city: {chosen_city}")
-
-                # 筛选出包含所选城市的手机号代码的行
-                chosen_phone_dp = dp[dp['region_name'].str.contains(chosen_city)]
-                # 如果找到了包含所选市的行，则从中随机选择一行输出
-                if not chosen_phone_dp.empty:
-                    chosen_row_phone = chosen_phone_dp.sample()
-                    phone_code = chosen_row_phone['phone_code'].values[0]
-                    phone = str(phone_code) + str(random.randint(1110, 9999))
-                else:
-                    print(f"No phone_code found for the city: {chosen_city}")   
-                
-                # 生成名字、性别和年龄
-                def generate_name(): 
-                    if random.random() < 0.8: # 80%三字 
-                        while True: 
-                            last = fake.last_name() 
-                            if len(last) == 1: # 需要双字名 
-                                first = fake.first_name() 
-                                if len(first) == 2: 
-                                    return last + first 
-                            elif len(last) == 2: # 需要单字名 
-                                first = fake.first_name() 
-                                if len(first) == 1: 
-                                    return last + first 
-                    else: # 20%二字 
-                        while True: 
-                            last = fake.last_name() 
-                            if len(last) == 1: 
-                                first = fake.first_name() 
-                                if len(first) == 1: 
-                                    return last + first
-                name = generate_name()
-                gender = 'male' if np.random.rand() < 0.4 else 'female'  # 男女比例2:3
-                age = np.random.normal(52.5, 10)
-                age = int(max(25, min(age, 80)))  # 限定年龄在25到80岁之间     
-                # 生成身份证号
-                id_number = generate_id_number(region_code, gender)
-                fake_data.append({
-                    '姓名': name,
-                    '电话': phone,
-                    '基础信息': id_number,
-                })
-            
-            return fake_data
-
-        # 生成虚假数据
-        num_entries = self.record_counts[0] + self.record_counts[1] + self.record_counts[2]
-        # 读取CSV文件
-        df = pd.read_csv(resource_path('area.csv'), header=None, names=['region_code', 'region_name']) # 地区代码
-        dp = pd.read_csv(resource_path('phone.csv'), header=None, names=['phone_code', 'region_name','city_code','operator','type']) # 电话代码
-
-        # 设定每个市出现的概率
-        cities = ["太原","晋中","大同","运城","忻州","吕梁","临汾","晋城","朔州","长治","阳泉"]
-        city_weights = [90,1,1,1,1,1,1,1,1,1,1]
-
-        fake = Faker(locale='zh_CN')
-        fake_data_list = generate_fake_data(num_entries)
-        # 存储最终选择的事件
-        selected_events = []
-        # 定义三个表页面的名称
-        sheet_names = ['存款', '理财', '贷款']
-        # 定义每张表需要随机选择的事件数量
-        num_events_to_select = [self.record_counts[0], self.record_counts[1], self.record_counts[2]]  # 例如：从Sheet1选2个，Sheet2选3个，Sheet3选1个
-        # 遍历每张表
-        for i, sheet_name in enumerate(sheet_names):
-            # 读取当前表
-            de = pd.read_excel(resource_path('events.xlsx'), sheet_name=sheet_name)
-            
-            # 提取事件和概率列
-            events = de.iloc[:, 0].values  # 第一列：事件
-            probabilities = de.iloc[:, 1].values  # 第二列：概率
-            
-            # 将概率归一化（确保总和为1）
-            probabilities = probabilities / np.sum(probabilities)
-            
-            # 按照概率随机选择指定数量的事件
-            selected = np.random.choice(events, size=num_events_to_select[i], p=probabilities, replace=True)
-            
-            # 将选择的事件添加到结果中
-            selected_events.extend(selected)
-        for i in range(len(fake_data_list)):
-            fake_data_list[i]['跟进记录'] = selected_events[i]
-        # 加载已有文件
-        wb = load_workbook(resource_path("电访记录表.xlsx"))
-        ws = wb.active
-
-
-        # 打印虚假数据
-        for row_num, person in enumerate(fake_data_list, start=2):  # 从第2行开始
-                # B列（第2列）写姓名
-                ws[f'B{row_num}'] = person.get('姓名', '')
-                
-                # C列（第3列）写手机号
-                ws[f'C{row_num}'] = person.get('电话', '')
-                
-                # D列（第4列）写身份证号
-                ws[f'D{row_num}'] = person.get('基础信息', '')
-                
-                # F列（第6列）写年龄
-                ws[f'G{row_num}'] = person.get('跟进记录', '')
-                print(person.get('姓名', ''),person.get('电话', ''),person.get('基础信息', ''),person.get('跟进记录', ''))
-
-        # 保存文件        
+
+        total = sum(self.record_counts)
+        self.progress = {'done': 0, 'total': total, 'start': time.perf_counter()}
+        self.progress_bar.configure(maximum=max(total, 1), value=0)
+        self.cancel_event.clear()
+        self.generate_button.configure(state=tk.DISABLED)
+        self.cancel_button.configure(state=tk.NORMAL)
+
+        profile_path = os.path.join(os.path.abspath("."), PROFILE_FILE) if self.profile_var.get() else None
+        unique_state = os.path.join(os.path.abspath("."), UNIQUE_STATE_FILE) if self.unique_persist_var.get() else None
+        unique = self.unique_var.get() or unique_state is not None
+        self.worker = threading.Thread(target=self.run_generation, daemon=True,
+                                       args=(list(self.record_counts), profile_path, unique, unique_state))
+        self.worker.start()
+        self.after(LOG_POLL_MS, self.poll_generation)
+
+    def run_generation(self, counts, profile_path=None, unique=False, unique_state=None):
+        """
+        后台线程：生成并写入文件，日志只写入 LogSink，不直接操作界面；结束时输出各阶段用时
+        unique: 电话与身份证号不重复；unique_state: 已分配号码的记录文件，写入成功后更新，跨次运行也不重复
+        生成完成但文件被占用、无法替换时，已生成的工作簿保留在进度目录中，再次以相同记录数生成时直接保存
+        """
+        from datetime import datetime
+        from generator import generate_file, load_engine, resource_path, GenerationCancelled, PARALLEL_MIN_RECORDS
+        from profiling import RunStats
+        from uniqueness import UniqueNumbers, NumberSpaceExhausted
+        from checkpoint import Checkpoint, CheckpointMismatch, checkpoint_dir
+        self.log_sink.take_dropped()
+        stats = RunStats()
+
+        def on_batch(batch):
+            self.progress['done'] += len(batch['姓名'])
+            # 打印虚假数据（界面与日志文件都不需要时跳过格式化）
+            if self.log_sink.enabled(LogSink.DETAIL):
+                records = zip(batch['姓名'], batch['电话'], batch['基础信息'], batch['跟进记录'])
+                self.log_sink.log_lines((' '.join(record) for record in records), LogSink.DETAIL)
+
+        # 记录较多时多进程并行生成
+        workers = (os.cpu_count() or 1) if sum(counts) >= PARALLEL_MIN_RECORDS else 1
+        # 以已有文件为模板，逐批生成并写回（姓名B、电话C、身份证号D、跟进记录G）
+        unique_numbers = None
+        output_path = resource_path("电访记录表.xlsx")
+        checkpoint = Checkpoint(checkpoint_dir(output_path))
         try:
-            wb.save(resource_path("电访记录表.xlsx"))
-            print("数据已成功写入!")
-                
+            saved = checkpoint.load()
+            if saved is not None and (saved['params']['counts'] != counts or saved['params']['unique'] != unique
+                                      or saved['params']['unique_state'] != unique_state):
+                checkpoint.clear()  # 记录数或选项已改变，放弃上次未保存的结果
+                saved = None
+            engine = None
+            if unique or saved is not None:
+                with stats.timer('load'):
+                    # 续传须使用上次的出生日期基准日
+                    engine = load_engine(ref_date=datetime.fromisoformat(saved['params']['ref_date']) if saved else None)
+            if unique:
+                unique_numbers = UniqueNumbers(engine.city_index, state_path=unique_state)
+            written = generate_file(counts, output_path, workers=workers, engine=engine, on_batch=on_batch,
+                                    cancel=self.cancel_event, stats=stats, profile_path=profile_path,
+                                    unique=unique_numbers, checkpoint=checkpoint)
+            self.progress['done'] = written
+            messages = ["上次生成的数据已保存!" if saved is not None else "数据已成功写入!"]
+        except GenerationCancelled as e:
+            checkpoint.clear()
+            messages = [f"{str(e)}，文件未修改"]
+        except NumberSpaceExhausted as e:
+            checkpoint.clear()
+            messages = [f"生成失败：{str(e)}，文件未修改"]
+        except CheckpointMismatch:
+            checkpoint.clear()
+            messages = ["参考数据或模板在上次生成后已修改，已放弃上次未保存的结果，请重新生成"]
         except Exception as e:
-            print(f"生成失败：{str(e)}")           
-            print(f"文件被占用，请关闭'电访记录表.xlsx'文件后重试")   
+            messages = [f"生成失败：{str(e)}", f"文件被占用，请关闭'电访记录表.xlsx'文件后重试"]
+            if checkpoint.state is not None and checkpoint.state['files']:
+                messages.append("已生成的数据已保留，关闭文件后以相同记录数再次点击生成即可直接保存")
+        dropped = self.log_sink.take_dropped()
+        if dropped:
+            messages.insert(0, f"（另有 {dropped} 条记录未在日志中显示）")
+        if unique_numbers is not None:
+            messages += unique_numbers.report_lines()
+        messages += stats.summary_lines()
+        if profile_path and os.path.exists(profile_path):
+            messages.append(f"性能分析结果已保存：{profile_path}（文本报告 {profile_path}.txt）")
+        self.log_sink.log_lines(messages)
+
+    def cancel_generation(self):
+        """请求取消后台生成"""
+        self.cancel_event.set()
+        self.cancel_button.configure(state=tk.DISABLED)
+
+    def poll_generation(self):
+        """主线程定时：刷新进度条与预计剩余时间"""
+        done, total = self.progress['done'], self.progress['total']
+        elapsed = time.perf_counter() - self.progress['start']
+        self.progress_bar.configure(value=done)
+        if self.worker.is_alive():
+            if done >= total:
+                self.progress_label.configure(text=f"{done}/{total}  正在保存…")
+            elif done:
+                remaining = elapsed / done * (total - done)
+                self.progress_label.configure(text=f"{done}/{total}  预计剩余 {remaining:.0f} 秒")
+            else:
+                self.progress_label.configure(text=f"0/{total}  正在生成…")
+            self.after(LOG_POLL_MS, self.poll_generation)
+            return
+        # 生成结束
+        self.progress_label.configure(text=f"{done}/{total}  用时 {elapsed:.1f} 秒")
+        self.generate_button.configure(state=tk.NORMAL)
+        self.cancel_button.configure(state=tk.DISABLED)
 
 
     def open_excel(self):
         """打开Excel文件"""
+        from generator import resource_path
         file_path = resource_path("电访记录表.xlsx")
         
         if os.path.exists(file_path):
@@ -569,13 +986,7 @@ class FinanceApp(tk.Tk):
             messagebox.showerror("文件不存在", f"未找到文件：{file_path}")
 
 
-def resource_path(relative_path):
-    """ 获取打包后资源的绝对路径 """
-    if hasattr(sys, '_MEIPASS'):
-        return os.path.join(sys._MEIPASS, relative_path)
-    return os.path.join(os.path.abspath("."), relative_path)
-
-
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后子进程启动所需
     app = FinanceApp()
     app.mainloop()
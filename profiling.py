@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""生成过程的分阶段计时、计数与 cProfile 性能分析"""
+import time
+from contextlib import contextmanager
+
+# 阶段 → 显示名称（按流水线顺序）
+STAGE_LABELS = {
+    'load': '读取参考数据',
+    'open': '打开模板',
+    'locations': '城市/地区/号码',
+    'ids': '身份证号',
+    'names': '姓名',
+    'events': '跟进记录',
+    'unique': '号码去重',
+    'callback': '界面与日志',
+    'write': '写入',
+    'checkpoint': '保存进度',
+    'save': '保存文件',
+    'wait_write': '生成等待写入',
+    'wait_generate': '写入等待生成',
+}
+PROFILE_TOP = 40  # 文本报告中列出的函数数
+
+_session = None  # 进行中的性能分析（各线程的 cProfile.Profile 列表），其他线程据此加入
+
+
+class RunStats:
+    """
+    一次生成的统计：各阶段累计用时（秒）、调用次数与计数器
+    可序列化，多进程生成时子进程的统计合并到主进程
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timers = {}  # 阶段 → 累计秒数
+        self.calls = {}  # 阶段 → 次数
+        self.counters = {}  # 名称 → 计数
+
+    @contextmanager
+    def timer(self, stage):
+        """为代码块计时，累加到 stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[stage] = self.timers.get(stage, 0.0) + time.perf_counter() - start
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def count(self, name, n=1):
+        """计数器加 n"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """合并另一份统计（如子进程返回的）"""
+        for stage, seconds in other.timers.items():
+            self.timers[stage] = self.timers.get(stage, 0.0) + seconds
+        for stage, calls in other.calls.items():
+            self.calls[stage] = self.calls.get(stage, 0) + calls
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def elapsed(self):
+        """创建以来经过的时间（秒）"""
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """转换为可写入 JSON 的字典"""
+        return {'elapsed_s': round(self.elapsed(), 4),
+                'timers': {stage: round(seconds, 4) for stage, seconds in self.timers.items()},
+                'calls': dict(self.calls), 'counters': dict(self.counters)}
+
+    def summary_lines(self):
+        """汇总文本：总用时与吞吐，各阶段用时及占比"""
+        elapsed = self.elapsed()
+        records = self.counters.get('records', 0)
+        lines = [f"用时统计：共 {elapsed:.2f} 秒，{records} 条记录（{records / elapsed if elapsed else 0:.0f} 条/秒）"]
+        stages = [stage for stage in STAGE_LABELS if stage in self.timers]
+        stages += [stage for stage in self.timers if stage not in STAGE_LABELS]
+        for stage in stages:
+            seconds = self.timers[stage]
+            lines.append(f"  {STAGE_LABELS.get(stage, stage)}：{seconds:.3f} 秒（{seconds / elapsed if elapsed else 0:.0%}）")
+        if self.counters.get('workers', 1) > 1:
+            lines.append("  （多进程生成时，生成各阶段为各进程用时之和）")
+        return lines
+
+
+@contextmanager
+def profiled(path):
+    """
+    以 cProfile 分析当前线程中的代码块（期间其他线程可用 profile_thread() 加入），结束后合并写出
+    path（pstats 格式）及 path.txt（按累计用时排序的前 PROFILE_TOP 个函数）；path 为空时不分析
+    """
+    global _session
+    if not path:
+        yield
+        return
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    session = _session = [profiler]
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _session = None
+        pstats.Stats(*session).dump_stats(path)
+        with open(path + '.txt', 'w', encoding='utf-8') as f:
+            pstats.Stats(*session, stream=f).sort_stats('cumulative').print_stats(PROFILE_TOP)
+
+
+@contextmanager
+def profile_thread():
+    """性能分析进行中时分析当前线程中的代码块（如写入线程），结果并入同一份报告"""
+    session = _session
+    if session is None:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ 的 cProfile 基于 sys.monitoring，同时只能启用一个分析器，
+        # profiled() 的分析器已能看到所有线程的调用，不再单独分析本线程
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        session.append(profiler)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+参考数据缓存：area.csv、phone.csv、events.xlsx 解析一次后常驻内存，文件修改时间或大小变化时才重新读取
+
+源文件旁的快照文件 refdata.snap 以列式二进制保存解析结果（及姓名表），启动时直接映射读取，
+源文件内容变化（SHA-1 不符）或没有快照时回退为解析源文件。读取时从不写快照，
+修改源文件后及打包前（refdata.snap 与源文件一同打包）手动重建：
+
+    python refdata.py
+"""
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from fileutil import atomic_write
+
+SNAPSHOT_FILE = 'refdata.snap'
+_SNAPSHOT_MAGIC = b'CNSNAP01'
+_SNAPSHOT_ALIGN = 64
+_SNAPSHOT_VERSION = 1
+
+_cache = {}  # key → (文件状态, 解析结果)
+_lock = threading.Lock()
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def cached(key, paths, loader):
+    """
+    按 key 缓存 loader() 的结果
+    paths: 依赖的文件，任一文件的修改时间或大小变化时重新加载
+    """
+    stamp = tuple(_stamp(path) for path in paths)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+    value = loader()
+    with _lock:
+        _cache[key] = (stamp, value)
+    return value
+
+
+def clear():
+    """清空缓存"""
+    with _lock:
+        _cache.clear()
+
+
+def file_digest(path):
+    """源文件内容的 SHA-1（打包后文件修改时间会变，快照以内容判断是否过期）"""
+    def digest():
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    return cached(('digest', path), [path], digest)
+
+
+def write_snapshot(path, arrays, meta):
+    """
+    写出快照：8字节标识 + 8字节头长度 + JSON 头（元数据及各数组的类型/形状/偏移）+ 按64字节对齐的数组数据
+    arrays: {名称: ndarray}（不支持 object 类型）
+    """
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype == object:
+            raise TypeError(f"快照不支持 object 数组：{name}")
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // _SNAPSHOT_ALIGN) * _SNAPSHOT_ALIGN
+    header = json.dumps({'meta': meta, 'arrays': layout}, ensure_ascii=False).encode('utf-8')
+    data_start = -(-(16 + len(header)) // _SNAPSHOT_ALIGN) * _SNAPSHOT_ALIGN
+
+    with atomic_write(path) as tmp_path, open(tmp_path, 'wb') as f:
+        f.write(_SNAPSHOT_MAGIC + len(header).to_bytes(8, 'little') + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name][2])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+
+
+def read_snapshot(path):
+    """映射读取快照，返回 (元数据, {名称: ndarray})；数组复制出来后即释放映射，快照文件可随时被替换"""
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    try:
+        if bytes(mm[:8]) != _SNAPSHOT_MAGIC:
+            raise ValueError(f"不是有效的快照文件：{path}")
+        size = int.from_bytes(bytes(mm[8:16]), 'little')
+        header = json.loads(bytes(mm[16:16 + size]).decode('utf-8'))
+        data_start = -(-(16 + size) // _SNAPSHOT_ALIGN) * _SNAPSHOT_ALIGN
+        arrays = {}
+        for name, (dtype, shape, offset) in header['arrays'].items():
+            dtype = np.dtype(dtype)
+            start = data_start + offset
+            count = int(np.prod(shape, dtype=np.int64))
+            arrays[name] = np.asarray(mm[start:start + count * dtype.itemsize]).view(dtype).reshape(shape).copy()
+    finally:
+        del mm
+    return header['meta'], arrays
+
+
+def _snapshot(directory):
+    """读取目录下的快照（按文件修改时间缓存），不存在或损坏时返回 None"""
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        return cached(('snapshot', path), [path], lambda: read_snapshot(path))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _current_snapshot(path):
+    """源文件所在目录的快照，快照不存在或其中该源文件的内容已过期时返回 None"""
+    snapshot = _snapshot(os.path.dirname(os.path.abspath(path)))
+    if snapshot is not None:
+        meta = snapshot[0]
+        if meta.get('version') == _SNAPSHOT_VERSION and meta['sources'].get(os.path.basename(path)) == file_digest(path):
+            return snapshot
+    return None
+
+
+def uses_snapshot(path):
+    """源文件 path 是否从快照读取（而不是解析源文件）"""
+    return _current_snapshot(path) is not None
+
+
+def _load_section(path, from_snapshot, reader):
+    """快照中该源文件的内容未过期则直接取用，否则解析源文件"""
+    snapshot = _current_snapshot(path)
+    if snapshot is not None:
+        return from_snapshot(*snapshot)
+    return reader(path)
+
+
+def _read_area(path):
+    import pandas as pd
+    df = pd.read_csv(path, header=None, names=['region_code', 'region_name']) # 地区代码
+    return df['region_code'].to_numpy(dtype=np.int64), df['region_name'].to_numpy(dtype=str)
+
+
+def _read_phone(path):
+    import pandas as pd
+    dp = pd.read_csv(path, header=None, names=['phone_code', 'region_name','city_code','operator','type']) # 电话代码
+    return dp['phone_code'].to_numpy(dtype=np.int64), dp['region_name'].fillna('').to_numpy(dtype=str)
+
+
+def _read_events(path):
+    import pandas as pd
+    with pd.ExcelFile(path) as xls:
+        sheets = {}
+        for sheet_name in xls.sheet_names:
+            df = xls.parse(sheet_name)
+            # 第一列：事件，第二列：权重（保留原始数值类型）
+            sheets[sheet_name] = (df.iloc[:, 0].to_numpy(dtype=str), df.iloc[:, 1].to_numpy())
+    return sheets
+
+
+def load_area(path):
+    """地区代码表：(region_codes int64 数组, region_names 字符串数组)"""
+    return cached(('area', path), [path], lambda: _load_section(
+        path, lambda meta, arrays: (arrays['area.codes'], arrays['area.names']), _read_area))
+
+
+def load_phone(path):
+    """手机号段表：(phone_codes int64 数组, region_names 字符串数组)"""
+    return cached(('phone', path), [path], lambda: _load_section(
+        path, lambda meta, arrays: (arrays['phone.codes'], arrays['phone.names']), _read_phone))
+
+
+def load_event_sheets(path):
+    """事件表的全部工作表：{工作表名: (事件数组, 权重数组)}，保持文件中的顺序"""
+    def from_snapshot(meta, arrays):
+        return {name: (arrays[f'events.{i}.texts'], arrays[f'events.{i}.weights']) for i, name in enumerate(meta['sheets'])}
+    return cached(('events', path), [path], lambda: _load_section(path, from_snapshot, _read_events))
+
+
+def load_snapshot_names(directory):
+    """快照中的姓名表 {表名: (字符串数组, 权重数组)}，没有快照时返回 None"""
+    snapshot = _snapshot(directory)
+    if snapshot is None or 'names' not in snapshot[0]:
+        return None
+    _, arrays = snapshot
+    return {key: (arrays[f'names.{key}'], arrays[f'names.{key}.weights']) for key in snapshot[0]['names']}
+
+
+def build_snapshot(area_path, phone_path, events_path, names=None):
+    """
+    由源文件重建快照（写在源文件所在目录）
+    names: 可选的姓名表 {表名: (字符串数组, 权重数组)}，一并写入后启动时无需加载 Faker
+    """
+    directory = os.path.dirname(os.path.abspath(area_path))
+    region_codes, region_names = load_area(area_path)
+    phone_codes, phone_names = load_phone(phone_path)
+    sheets = load_event_sheets(events_path)
+    arrays = {'area.codes': region_codes, 'area.names': region_names,
+              'phone.codes': phone_codes, 'phone.names': phone_names}
+    for i, (texts, weights) in enumerate(sheets.values()):
+        arrays[f'events.{i}.texts'] = np.asarray(texts, dtype=str)
+        arrays[f'events.{i}.weights'] = weights
+    meta = {'version': _SNAPSHOT_VERSION, 'sheets': list(sheets),
+            'sources': {os.path.basename(path): file_digest(path) for path in (area_path, phone_path, events_path)}}
+    if names is not None:
+        meta['names'] = list(names)
+        for key, (texts, weights) in names.items():
+            arrays[f'names.{key}'] = np.asarray(texts, dtype=str)
+            arrays[f'names.{key}.weights'] = np.asarray(weights, dtype=float)
+    write_snapshot(os.path.join(directory, SNAPSHOT_FILE), arrays, meta)
+
+
+def main():
+    """由 area.csv、phone.csv、events.xlsx 及 Faker 姓名表重建快照"""
+    from generator import NamePool, resource_path
+    paths = [resource_path(name) for name in ('area.csv', 'phone.csv', 'events.xlsx')]
+    build_snapshot(*paths, names=NamePool.from_faker().tables)
+    print(f"已生成快照：{os.path.join(os.path.dirname(paths[0]), SNAPSHOT_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
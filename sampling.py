@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+加权抽样：Walker/Vose 别名表，构建 O(n)，每次抽取 O(1)
+
+    python sampling.py          # 对城市权重及 events.xlsx 各表权重做统计自检
+"""
+import math
+import numpy as np
+
+
+class AliasSampler:
+    """按权重抽取下标的别名表，同一权重表只需构建一次"""
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim != 1 or len(weights) == 0:
+            raise ValueError("权重不能为空")
+        if (weights < 0).any() or not np.isfinite(weights).all():
+            raise ValueError("权重必须为非负数")
+        total = weights.sum()
+        if total <= 0:
+            raise ValueError("权重之和必须大于0")
+        n = len(weights)
+        self.p = weights / total
+        scaled = self.p * n
+        self.prob = np.ones(n)
+        self.alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩余项只因浮点误差未归零，概率视为1
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, size, rng):
+        """抽取 size 个下标"""
+        x = rng.random(size) * len(self.prob)
+        idx = x.astype(np.int64)
+        return np.where(x - idx < self.prob[idx], idx, self.alias[idx])
+
+
+def chi_square_test(sampler, draws=1_000_000, rng=None):
+    """
+    统计自检：抽取 draws 次，比较各下标出现频率与配置权重
+    返回 (卡方值, 自由度, p值, 权重为0却被抽中的次数)
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    observed = np.bincount(sampler.sample(draws, rng), minlength=len(sampler))
+    expected = sampler.p * draws
+    positive = expected > 0
+    chi2 = float((((observed - expected) ** 2)[positive] / expected[positive]).sum())
+    dof = int(positive.sum()) - 1
+    if dof <= 0:
+        return chi2, dof, 1.0, int(observed[~positive].sum())
+    # Wilson–Hilferty 近似计算卡方分布上尾概率
+    z = ((chi2 / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return chi2, dof, 0.5 * math.erfc(z / math.sqrt(2)), int(observed[~positive].sum())
+
+
+def self_test(tables, draws=1_000_000, alpha=1e-3, seed=0):
+    """对 {名称: 权重} 逐一自检并打印结果，全部通过返回 True"""
+    rng = np.random.default_rng(seed)
+    passed = True
+    for name, weights in tables.items():
+        chi2, dof, p_value, impossible = chi_square_test(AliasSampler(weights), draws, rng)
+        ok = p_value >= alpha and impossible == 0
+        passed &= ok
+        print(f"{'通过' if ok else '失败'}  {name}：卡方={chi2:.1f} 自由度={dof} p={p_value:.4f}")
+    return passed
+
+
+def main():
+    from generator import CITY_WEIGHTS, resource_path
+    import refdata
+    tables = {'城市': CITY_WEIGHTS}
+    for sheet_name, (_, weights) in refdata.load_event_sheets(resource_path('events.xlsx')).items():
+        tables[f'事件-{sheet_name}'] = weights
+    raise SystemExit(0 if self_test(tables) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+可续传生成的回归测试（在仓库根目录运行 python -m pytest -q）
+中途强行结束后 --resume 的结果须与不中断时逐字节相同；不能续写的写入器不因保存进度而逐批等待写入线程
+生成器按当前目录查找资源文件，各测试在复制了资源文件的临时目录中运行，不在仓库中留下文件
+"""
+import os
+import sys
+import time
+import shutil
+import subprocess
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COMMON = ['--counts', '60000', '20000', '20000', '--seed', '5', '--batch-size', '5000', '--ref-date', '2025-01-01']
+GENERATOR = os.path.join(ROOT, 'generator.py')
+RESOURCES = ['area.csv', 'phone.csv', 'events.xlsx', '电访记录表.xlsx']
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    """复制了资源文件的临时工作目录"""
+    path = tmp_path / 'work'
+    path.mkdir()
+    for name in RESOURCES:
+        shutil.copy(os.path.join(ROOT, name), path / name)
+    return str(path)
+
+
+def run_generator(cwd, *args):
+    """在新进程中运行生成器（资源文件按当前目录 cwd 查找）"""
+    return subprocess.run([sys.executable, GENERATOR, *args], cwd=cwd, capture_output=True, timeout=600)
+
+
+def kill_after_checkpoint(cwd, output, *args):
+    """启动带 --checkpoint 的生成，第一次保存进度后立即强行结束（POSIX 为 SIGKILL，Windows 为 TerminateProcess）"""
+    state = os.path.join(output + '.checkpoint', 'checkpoint.json')
+    proc = subprocess.Popen([sys.executable, GENERATOR, *args, '-o', output, '--checkpoint', '--checkpoint-interval', '0'],
+                            cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while proc.poll() is None and not os.path.exists(state):
+            time.sleep(0.005)
+        assert proc.poll() is None, "生成在第一次保存进度前已结束，无法测试中断"
+        proc.kill()
+    finally:
+        proc.wait()
+
+
+def read_files(directory):
+    """目录中的输出文件 {文件名: 内容}"""
+    result = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.npz') and os.path.isfile(os.path.join(directory, name)):
+            with open(os.path.join(directory, name), 'rb') as f:
+                result[name] = f.read()
+    return result
+
+
+@pytest.mark.parametrize('fmt, extra', [
+    ('csv', ['--rows-per-file', '35000', '--unique']),
+    ('jsonl', []),
+    ('parquet', ['--rows-per-file', '20000']),
+])
+def test_resume_after_kill_is_identical(tmp_path, workdir, fmt, extra):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    ref_dir, res_dir = tmp_path / 'ref', tmp_path / 'res'
+    ref_dir.mkdir()
+    res_dir.mkdir()
+    if '--unique' in extra:
+        extra = [arg for arg in extra if arg != '--unique']
+        ref_extra = extra + ['--unique-state', str(ref_dir / 'u.npz')]
+        res_extra = extra + ['--unique-state', str(res_dir / 'u.npz')]
+    else:
+        ref_extra = res_extra = extra
+    reference = run_generator(workdir, *COMMON, '--format', fmt, '-o', str(ref_dir / f'out.{fmt}'), *ref_extra)
+    assert reference.returncode == 0, reference.stderr.decode('utf-8', 'replace')
+
+    output = str(res_dir / f'out.{fmt}')
+    kill_after_checkpoint(workdir, output, *COMMON, '--format', fmt, *res_extra)
+    assert os.path.isdir(output + '.checkpoint')
+    assert not os.path.exists(output)
+    resumed = run_generator(workdir, '-o', output, '--resume')
+    assert resumed.returncode == 0, resumed.stderr.decode('utf-8', 'replace')
+    assert not os.path.exists(output + '.checkpoint')
+
+    expected, actual = read_files(ref_dir), read_files(res_dir)
+    assert sorted(actual) == sorted(expected)
+    for name in expected:
+        assert actual[name] == expected[name], name
+    if (ref_dir / 'u.npz').exists():
+        a, b = np.load(ref_dir / 'u.npz'), np.load(res_dir / 'u.npz')
+        for key in ('phone_used', 'id_used', 'secret'):
+            assert (a[key] == b[key]).all(), key
+
+
+@pytest.mark.parametrize('fmt, options, drains', [
+    ('xlsx', {}, 0),
+    ('parquet', {}, 0),
+    ('parquet', {'rows_per_file': 2000}, 3),
+    ('csv', {}, 12),
+])
+def test_checkpoint_drains_only_when_writer_can_resume(tmp_path, workdir, monkeypatch, fmt, options, drains):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    import writers
+    from generator import generate_file
+    from checkpoint import Checkpoint, checkpoint_dir
+    monkeypatch.chdir(workdir)
+    calls = []
+    drain = writers.WriterThread.drain
+
+    def counting_drain(self):
+        calls.append(self.written)
+        return drain(self)
+    monkeypatch.setattr(writers.WriterThread, 'drain', counting_drain)
+    output = str(tmp_path / f'out.{fmt}')
+    written = generate_file((4000, 1000, 1000), output, fmt, seed=1, batch_size=500, writer_options=options,
+                            checkpoint=Checkpoint(checkpoint_dir(output), interval=0))
+    assert written == 6000
+    assert len(calls) == drains
+    assert not os.path.exists(checkpoint_dir(output))
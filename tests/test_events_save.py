@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""事件表保存：只改写有修改的工作表中修改、删除、新增的行"""
+import os
+import sys
+import stat
+import shutil
+import zipfile
+from openpyxl import load_workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from writers import patch_sheet_rows
+
+
+def sheet_rows(path):
+    wb = load_workbook(path)
+    return {ws.title: [tuple(row) for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+
+
+def test_patch_sheet_rows(tmp_path):
+    path = str(tmp_path / 'events.xlsx')
+    shutil.copy(os.path.join(ROOT, 'events.xlsx'), path)
+    os.chmod(path, 0o640)
+    before = sheet_rows(path)
+    sheet = next(iter(before))
+    rows = before[sheet]
+
+    # 行号为修改前的行号：改第3行，删第2、5行，追加两行
+    patch_sheet_rows(path, {sheet: ({3: ('改过的事件 <&>', 4.5)}, {2, 5}, [('新增一', 1), ('新增二', 2.25)])})
+
+    expected = [rows[0], ('改过的事件 <&>', 4.5)] + rows[3:4] + rows[5:] + [('新增一', 1), ('新增二', 2.25)]
+    after = sheet_rows(path)
+    assert after[sheet] == expected
+    assert {name: value for name, value in after.items() if name != sheet} == \
+           {name: value for name, value in before.items() if name != sheet}
+    assert load_workbook(path)[sheet].dimensions == f'A1:B{len(expected)}'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+    # 其余工作表的 XML 原样复制
+    with zipfile.ZipFile(os.path.join(ROOT, 'events.xlsx')) as a, zipfile.ZipFile(path) as b:
+        assert a.read('xl/worksheets/sheet2.xml') == b.read('xl/worksheets/sheet2.xml')
+        assert a.read('xl/styles.xml') == b.read('xl/styles.xml')
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""号码不重复：某个城市的号段全部用尽时改用其他城市的号段，不中断生成"""
+import os
+import sys
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import refdata
+from generator import CityIndex, CITIES, build_id_numbers
+from uniqueness import UniqueNumbers, PHONE_SPACE
+
+CITY = '临汾'  # 只有 2 个号段的城市
+
+
+def test_exhausted_city_falls_back_to_other_cities():
+    city_index = CityIndex(refdata.load_area(os.path.join(ROOT, 'area.csv')),
+                           refdata.load_phone(os.path.join(ROOT, 'phone.csv')), CITIES)
+    prefixes = city_index.phone_codes[CITY]
+    capacity = len(prefixes) * PHONE_SPACE
+    n = capacity + 5000
+    rng = np.random.default_rng(0)
+    regions = rng.choice(city_index.region_codes[CITY], size=n)
+    birth = np.datetime64('1960-01-01') + rng.integers(0, 20000, size=n).astype('timedelta64[D]')
+    batch = {'电话': (rng.choice(prefixes, size=n) * 10000 + 1234).astype(str),
+             '基础信息': build_id_numbers(regions, birth, rng.integers(0, 2, size=n), rng)}
+
+    unique = UniqueNumbers(city_index, seed=1)
+    half = n // 2  # 分两批，第二批中途用尽
+    phones = np.concatenate([unique.apply({key: value[:half] for key, value in batch.items()})['电话'],
+                             unique.apply({key: value[half:] for key, value in batch.items()})['电话']])
+
+    assert len(np.unique(phones)) == n
+    in_city = np.isin(phones.astype(np.int64) // 10000, prefixes)
+    assert in_city.sum() == capacity
+    assert unique.exhausted_cities == [CITY]
+    assert any(CITY in line and '其他城市' in line for line in unique.report_lines())
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""分片写入器 close() 替换正式文件失败时不在输出目录留下临时文件"""
+import os
+import sys
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import writers
+from writers import CsvWriter, FIELDS
+
+
+def test_close_removes_temp_files_when_replace_fails(tmp_path, monkeypatch):
+    writer = CsvWriter(str(tmp_path / 'out.csv'), rows_per_file=40)
+    writer.write_batch({key: np.array([f'{key}{i}' for i in range(100)]) for key in FIELDS})
+    replace_file = writers.replace_file
+    replaced = []
+
+    def locked_after_first(tmp, path):
+        """第一个分片替换成功，之后的正式文件被占用"""
+        if replaced:
+            raise PermissionError(path)
+        replace_file(tmp, path)
+        replaced.append(path)
+    monkeypatch.setattr(writers, 'replace_file', locked_after_first)
+
+    with pytest.raises(PermissionError):
+        writer.close()
+    assert sorted(os.listdir(tmp_path)) == ['out.part00000.csv']
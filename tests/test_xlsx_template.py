@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""流式写出的电访记录表沿用模板各工作表的版式与打印设置"""
+import os
+import sys
+import numpy as np
+from openpyxl import load_workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from writers import StreamingXlsxWriter, FIELDS
+
+TEMPLATE = os.path.join(ROOT, '电访记录表.xlsx')
+
+
+def layout(ws):
+    """需要与模板一致的工作表设置"""
+    setup = ws.sheet_properties.pageSetUpPr
+    return {
+        'defaultRowHeight': ws.sheet_format.defaultRowHeight,
+        'fitToPage': setup.fitToPage if setup is not None else None,
+        'scale': ws.page_setup.scale,
+        'orientation': ws.page_setup.orientation,
+        'paperSize': ws.page_setup.paperSize,
+        'fitToWidth': ws.page_setup.fitToWidth,
+        'fitToHeight': ws.page_setup.fitToHeight,
+        'zoomScale': ws.sheet_view.zoomScale,
+        'freeze_panes': ws.freeze_panes,
+        'margins': (ws.page_margins.left, ws.page_margins.right, ws.page_margins.top, ws.page_margins.bottom),
+        'widths': {key: dim.width for key, dim in ws.column_dimensions.items()},
+        'merged': sorted(str(r) for r in ws.merged_cells.ranges),
+    }
+
+
+def test_output_keeps_template_layout(tmp_path):
+    output = str(tmp_path / 'out.xlsx')
+    writer = StreamingXlsxWriter(output, TEMPLATE)
+    writer.write_batch({key: np.array([f'{key}{i}' for i in range(100)]) for key in FIELDS})
+    writer.close()
+
+    template, result = load_workbook(TEMPLATE), load_workbook(output)
+    assert result.sheetnames == template.sheetnames
+    assert result.active.title == template.active.title
+    for source, target in zip(template.worksheets, result.worksheets):
+        assert layout(target) == layout(source), source.title
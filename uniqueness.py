@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+电话号码与身份证号的唯一性保证
+
+每个号段（电话）或 地区代码+出生日期+性别（身份证号）只记一个已分配数量，
+第 k 个号码取该键上以密钥打乱的 [0, 号码空间) 置换的第 k 项：号码看起来随机，且同一键下不会重复。
+计数器为定长数组（电话约 4000 个号段，身份证号按地区×日期×性别），内存与记录数无关；
+保存计数器与密钥即可在之后的运行中继续保证不重复。
+"""
+import os
+import json
+import numpy as np
+from generator import format_id_numbers, parse_digits, digits_value
+from fileutil import atomic_write
+
+PHONE_MIN_SUFFIX = 1110  # 手机号后四位范围 1110–9999
+PHONE_SPACE = 10000 - PHONE_MIN_SUFFIX
+ID_SPACE = 500  # 同一地区、出生日期、性别下的顺序码数（三位顺序码中末位奇偶固定）
+ID_EPOCH = np.datetime64('1900-01-01', 'D')  # 出生日期下标的起点
+ID_DAYS = int((np.datetime64('2100-01-01', 'D') - ID_EPOCH).astype(np.int64))
+STATE_VERSION = 1
+
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_ROUNDS = [np.uint64(0x9E3779B97F4A7C15 * r % 2**64) for r in range(1, 5)]  # 各轮常数
+
+
+class NumberSpaceExhausted(ValueError):
+    """号码空间已全部用完（电话：所有号段；身份证：某个地区、出生日期、性别）"""
+
+
+def _mix(x):
+    """splitmix64 的混合函数（uint64 数组）"""
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def permute(keys, index, space, secret):
+    """
+    以 (keys, secret) 为密钥的 [0, space) 上的伪随机置换，返回 index 对应的值
+    4 轮平衡 Feistel 网络作用于不小于 space 的 2 的幂区间，超出 space 的结果继续迭代（循环行走）
+    """
+    half = max(1, (int(space - 1).bit_length() + 1) // 2)
+    mask = np.uint64((1 << half) - 1)
+    keys = _mix(np.asarray(keys, dtype=np.uint64) ^ np.uint64(secret))
+    values = np.asarray(index, dtype=np.uint64).copy()
+    pending = np.ones(len(values), dtype=bool)
+    while pending.any():
+        x, k = values[pending], keys[pending]
+        left, right = x >> np.uint64(half), x & mask
+        for round_key in _ROUNDS:
+            left, right = right, left ^ (_mix(k + round_key + right) & mask)
+        values[pending] = (left << np.uint64(half)) | right
+        pending[pending] = values[pending] >= space
+    return values.astype(np.int64)
+
+
+def _format_digits(numbers, width):
+    """非负整数数组 → 定长数字字符串数组"""
+    digits = np.asarray(numbers, dtype=np.int64)[:, None] // 10 ** np.arange(width - 1, -1, -1, dtype=np.int64) % 10
+    return (digits + ord('0')).astype(np.uint8).view(f'S{width}').ravel().astype(f'U{width}')
+
+
+def _ranks(keys):
+    """每个元素在相同键中的出现序号（从0开始，保持原顺序）"""
+    n = len(keys)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = np.arange(n) - group_start
+    return ranks
+
+
+class UniqueNumbers:
+    """
+    在主进程中按批次顺序改写电话号码后四位与身份证顺序码，保证同一次（或跨次）运行中不重复
+    号段用尽时该号段的记录改用同市其他号段并记录在 exhausted 中；全市号段都用尽时改用其他城市的号段，
+    并记录在 exhausted_cities 中；所有号段都用尽时才抛出 NumberSpaceExhausted
+    """
+    def __init__(self, city_index, seed=None, state_path=None):
+        """
+        city_index: generator.CityIndex（号段、地区代码及所属城市）
+        seed: 置换密钥与换号段抽样的种子；读取已保存的状态时使用保存的密钥
+        state_path: 保存已分配情况的文件（.npz），存在时读取，save() 时写回
+        """
+        self.state_path = state_path
+        self.cities = list(city_index.cities)
+        codes = [np.asarray(city_index.phone_codes[city], dtype=np.int64) for city in self.cities]
+        prefixes = np.concatenate(codes)
+        order = np.argsort(prefixes, kind='stable')
+        self.phone_prefixes = prefixes[order]
+        self.phone_cities = np.repeat(np.arange(len(self.cities)), [len(c) for c in codes])[order]
+        self.phone_used = np.zeros(len(self.phone_prefixes), dtype=np.int32)
+        self.id_regions = np.unique(np.concatenate([city_index.region_codes[city] for city in self.cities]).astype(np.int64))
+        self.id_used = np.zeros((len(self.id_regions), ID_DAYS * 2), dtype=np.uint16)  # 按需分配物理内存
+        self.secret = int(np.random.SeedSequence(seed).generate_state(1, np.uint64)[0])
+        self.exhausted = []  # [(号段, 城市)]，按用尽顺序
+        self.exhausted_cities = []  # 号段全部用尽、改用其他城市号段的城市，按用尽顺序
+        self.assigned = {'电话': 0, '基础信息': 0}
+        if state_path and os.path.exists(state_path):
+            self.load(state_path)
+        self.rng = np.random.default_rng(self.secret)
+
+    def apply(self, batch):
+        """改写一批记录的 电话 与 基础信息，返回同一个 batch"""
+        batch['电话'] = self._unique_phones(digits_value(parse_digits(batch['电话'], 11)))
+        batch['基础信息'] = self._unique_ids(np.asarray(batch['基础信息']))
+        return batch
+
+    def _unique_phones(self, phones):
+        slots = np.searchsorted(self.phone_prefixes, phones // 10000)
+        suffixes = np.empty(len(phones), dtype=np.int64)
+        pending = np.arange(len(phones))
+        while len(pending):
+            keys = slots[pending]
+            index = self.phone_used[keys] + _ranks(keys)
+            ok = index < PHONE_SPACE
+            done = pending[ok]
+            suffixes[done] = permute(self.phone_prefixes[slots[done]], index[ok], PHONE_SPACE, self.secret)
+            self.phone_used += np.bincount(keys, minlength=len(self.phone_used)).astype(np.int32)
+            np.minimum(self.phone_used, PHONE_SPACE, out=self.phone_used)
+            pending = pending[~ok]
+            if len(pending):
+                self._reassign_prefixes(slots, pending)
+        self.assigned['电话'] += len(phones)
+        return _format_digits(self.phone_prefixes[slots] * 10000 + PHONE_MIN_SUFFIX + suffixes, 11)
+
+    def _reassign_prefixes(self, slots, rows):
+        """号段已满的记录改为同市随机一个未满的号段，全市都已满时改为任一城市未满的号段"""
+        for slot in np.unique(slots[rows]):
+            prefix = int(self.phone_prefixes[slot])
+            if all(prefix != p for p, _ in self.exhausted):
+                self.exhausted.append((prefix, self.cities[self.phone_cities[slot]]))
+        for city_id in np.unique(self.phone_cities[slots[rows]]):
+            city_rows = rows[self.phone_cities[slots[rows]] == city_id]
+            free = np.flatnonzero((self.phone_cities == city_id) & (self.phone_used < PHONE_SPACE))
+            if len(free) == 0:
+                city = self.cities[city_id]
+                if city not in self.exhausted_cities:
+                    self.exhausted_cities.append(city)
+                free = np.flatnonzero(self.phone_used < PHONE_SPACE)
+                if len(free) == 0:
+                    total = len(self.phone_used)
+                    raise NumberSpaceExhausted(f"电话号码已全部用完（{total} 个号段，共 {total * PHONE_SPACE} 个号码）")
+            slots[city_rows] = free[self.rng.integers(0, len(free), size=len(city_rows))]
+
+    def _unique_ids(self, id_numbers):
+        n = len(id_numbers)
+        bodies = digits_value(parse_digits(id_numbers, 18)[:, :17])
+        regions = bodies // 10**11
+        date = bodies // 1000 % 10**8
+        birth = ((date // 10000 - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+                 + (date // 100 % 100 - 1)).astype('datetime64[D]') + (date % 100 - 1)
+        genders = bodies % 2
+        region_slots = np.searchsorted(self.id_regions, regions)
+        cells = (birth - ID_EPOCH).astype(np.int64) * 2 + genders
+        keys = region_slots * (ID_DAYS * 2) + cells
+        index = self.id_used[region_slots, cells].astype(np.int64) + _ranks(keys)
+        full = index >= ID_SPACE
+        if full.any():
+            row = int(np.flatnonzero(full)[0])
+            raise NumberSpaceExhausted(f"地区 {regions[row]}、出生日期 {birth[row]} 的身份证顺序码已全部用完（{ID_SPACE} 个）")
+        np.add.at(self.id_used, (region_slots, cells), 1)
+        seq = permute(regions * 2**20 + cells, index, ID_SPACE, self.secret) * 2 + genders
+        self.assigned['基础信息'] += n
+        return format_id_numbers(bodies - bodies % 1000 + seq)
+
+    def report_lines(self):
+        """本次唯一性处理的汇总"""
+        lines = [f"号码不重复：已分配电话 {self.assigned['电话']} 个、身份证号 {self.assigned['基础信息']} 个"]
+        for prefix, city in self.exhausted:
+            lines.append(f"  号段 {prefix}（{city}）已用尽，后续记录改用同市其他号段")
+        for city in self.exhausted_cities:
+            lines.append(f"  {city}的号段已全部用尽，后续{city}的记录改用其他城市的号段")
+        return lines
+
+    def save(self, path=None):
+        """保存已分配情况（先写临时文件再替换）"""
+        path = path or self.state_path
+        # run：本次运行中的换号段抽样状态、已用尽号段与计数，续传（load(resume=True)）时恢复
+        run = {'rng': self.rng.bit_generator.state, 'exhausted': self.exhausted,
+               'exhausted_cities': self.exhausted_cities, 'assigned': self.assigned}
+        with atomic_write(path, '.npz') as tmp_path, open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, version=STATE_VERSION, secret=np.uint64(self.secret),
+                                phone_prefixes=self.phone_prefixes, phone_used=self.phone_used,
+                                id_regions=self.id_regions, id_used=self.id_used, run=json.dumps(run))
+
+    def load(self, path, resume=False):
+        """
+        读取已保存的分配情况；号段表、地区表有变化时按号段/地区代码对应
+        resume: 续传中断的运行，同时恢复换号段抽样状态、已用尽号段与计数，使结果与不中断时相同
+        """
+        with np.load(path) as state:
+            if int(state['version']) != STATE_VERSION:
+                raise ValueError(f"不支持的号码记录文件版本：{path}")
+            self.secret = int(state['secret'])
+            self._restore(self.phone_prefixes, self.phone_used, state['phone_prefixes'], state['phone_used'])
+            self._restore(self.id_regions, self.id_used, state['id_regions'], state['id_used'])
+            run = json.loads(str(state['run'])) if resume else None
+        if run is not None:
+            self.rng = np.random.default_rng()
+            self.rng.bit_generator.state = run['rng']
+            self.exhausted = [tuple(item) for item in run['exhausted']]
+            self.exhausted_cities = run.get('exhausted_cities', [])
+            self.assigned = run['assigned']
+
+    @staticmethod
+    def _restore(codes, used, saved_codes, saved_used):
+        """按代码把保存的计数复制到当前数组"""
+        slots = np.searchsorted(codes, saved_codes)
+        slots = np.minimum(slots, len(codes) - 1)
+        found = codes[slots] == saved_codes
+        used[slots[found]] = saved_used[found]
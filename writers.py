@@ -0,0 +1,724 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import re
+import csv
+import json
+import zipfile
+import posixpath
+import threading
+from copy import copy
+from queue import Queue
+from xml.sax.saxutils import escape
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from profiling import RunStats, profile_thread
+from fileutil import atomic_write, temp_path, replace_file, remove_quietly
+
+# 生成的字段（列式批次的键），CSV/JSONL/Parquet 按此顺序输出
+FIELDS = ['姓名', '电话', '基础信息', '跟进记录']
+# 生成字段写入电访记录表的列号（B 姓名、C 电话、D 身份证号、G 跟进记录）
+XLSX_COLUMNS = {'姓名': 2, '电话': 3, '基础信息': 4, '跟进记录': 7}
+# 单个工作表最多 1048576 行，去掉表头
+XLSX_MAX_RECORDS = 1048575
+# 生成与写入之间最多排队的批次数
+PIPELINE_DEPTH = 2
+# 工作表 XML 中的行开始标签及其行号
+_ROW_TAG = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+_SHEET_DATA_END = b'</sheetData>'
+_CHUNK_SIZE = 1 << 20
+# 改写工作表 XML 中的行（patch_sheet_rows）
+_ROW = re.compile(rb'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+_ROW_NUMBER = re.compile(rb'(<row\b[^>]*?\sr=")(\d+)(")')
+_CELL = re.compile(rb'<c\b[^>]*?(?:/>|>.*?</c>)', re.S)
+_CELL_REF = re.compile(rb'(<c\b[^>]*?\sr="([A-Z]+))(\d+)(")')
+_CELL_STYLE = re.compile(rb'^<c\b[^>]*?(\ss="\d+")')
+_DIMENSION = re.compile(rb'(<dimension\b[^>]*?\sref="[^"]*?)(\d+)(")')
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+# 读取模板时各工作表先读入的行数，带序号的模板行更多时加大重读
+TEMPLATE_ROWS = 1000
+
+
+def commit_files(files):
+    """
+    把已写完的临时文件替换为正式文件：files 为 [(临时文件, 正式文件)]，已替换过的跳过（可重试）
+    正式文件沿用被替换文件的权限，新文件按 umask
+    """
+    for tmp_path, path in files:
+        if os.path.exists(tmp_path):
+            replace_file(tmp_path, path)
+
+
+def sheet_parts(archive):
+    """工作簿（zipfile.ZipFile）中的工作表：[(名称, 包内 XML 路径)] 与活动工作表下标"""
+    from xml.etree import ElementTree
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels}
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheets = []
+    for sheet in workbook.iter(f'{{{_MAIN_NS}}}sheet'):
+        target = targets[sheet.get(f'{{{_REL_NS}}}id')]
+        sheets.append((sheet.get('name'), target[1:] if target.startswith('/') else posixpath.normpath('xl/' + target)))
+    view = workbook.find(f'{{{_MAIN_NS}}}bookViews/{{{_MAIN_NS}}}workbookView')
+    active = int(view.get('activeTab', 0)) if view is not None else 0
+    return sheets, min(active, len(sheets) - 1)
+
+
+def _renumber(row, number):
+    """行及其单元格引用改为第 number 行"""
+    row = _ROW_NUMBER.sub(lambda m: m.group(1) + b'%d' % number + m.group(3), row, count=1)
+    return _CELL_REF.sub(lambda m: m.group(1) + b'%d' % number + m.group(4), row)
+
+
+def _value_cells(number, values, styles):
+    """第 number 行 A、B… 列的单元格：字符串写为内联字符串，数值直接写出；styles: {列: 样式属性}"""
+    cells = []
+    for column, value in zip((b'A', b'B', b'C', b'D'), values):
+        ref = b'%s%d"%s' % (column, number, styles.get(column, b''))
+        if isinstance(value, str):
+            text = escape(value).encode('utf-8')
+            cells.append(b'<c r="%s t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % (ref, text))
+        else:
+            cells.append(b'<c r="%s t="n"><v>%s</v></c>' % (ref, repr(value).encode('ascii')))
+    return cells
+
+
+def _edit_row(row, number, values):
+    """改写一行的前 len(values) 列（保留单元格样式与其余列），行号改为 number"""
+    row = _renumber(row, number)
+    if row.endswith(b'/>'):
+        row = row[:-2] + b'></row>'
+    start, end = row.index(b'>') + 1, row.rindex(b'</row>')
+    columns = [b'A', b'B', b'C', b'D'][:len(values)]
+    styles, others = {}, []
+    for match in _CELL.finditer(row, start, end):
+        cell = match.group()
+        column = _CELL_REF.match(cell).group(2)
+        if column in columns:
+            style = _CELL_STYLE.match(cell)
+            if style:
+                styles[column] = style.group(1)
+        else:
+            others.append(cell)
+    return row[:start] + b''.join(_value_cells(number, values, styles) + others) + row[end:]
+
+
+def _patch_rows(xml, edited, deleted, added):
+    """改写工作表 XML 的 sheetData：见 patch_sheet_rows"""
+    xml = xml.replace(b'<sheetData/>', b'<sheetData></sheetData>')
+    head, rest = xml.split(b'<sheetData>', 1)
+    body, tail = rest.split(_SHEET_DATA_END, 1)
+    rows, shift, last = [], 0, 0
+    for match in _ROW.finditer(body):
+        row = match.group()
+        number = int(_ROW_NUMBER.search(row).group(2))
+        if number in deleted:
+            shift += 1
+            continue
+        last = number - shift
+        if number in edited:
+            row = _edit_row(row, last, edited[number])
+        elif shift:
+            row = _renumber(row, last)
+        rows.append(row)
+    for values in added:
+        last += 1
+        rows.append(b'<row r="%d">%s</row>' % (last, b''.join(_value_cells(last, values, {}))))
+    head = _DIMENSION.sub(lambda m: m.group(1) + b'%d' % max(last, 1) + m.group(3), head, count=1)
+    return head + b'<sheetData>' + b''.join(rows) + _SHEET_DATA_END + tail
+
+
+def patch_sheet_rows(path, changes):
+    """
+    只改写 xlsx 中指定工作表的若干行：这些工作表的 XML 逐行替换，其余部分（样式、其他工作表等）原样复制，
+    不经 openpyxl 解析整个工作簿；先写临时文件再替换，文件权限不变
+    changes: {工作表名: (修改的行 {行号: 值元组}, 删除的行号集合, 追加的行 [值元组])}，值依次写入 A、B… 列；
+             行号均为修改前的行号，删除的行之后的行上移，追加的行接在最后一行之后
+    """
+    with atomic_write(path, '.xlsx') as tmp_path:
+        with zipfile.ZipFile(path) as source, zipfile.ZipFile(tmp_path, 'w') as target:
+            sheet_paths = dict(sheet_parts(source)[0])
+            members = {sheet_paths[name]: change for name, change in changes.items()}
+            for info in source.infolist():
+                data = source.read(info)
+                if info.filename in members:
+                    data = _patch_rows(data, *members[info.filename])
+                target.writestr(info, data)
+
+
+def _styled_cell(ws, source, value):
+    """按模板单元格的样式创建只写单元格"""
+    cell = WriteOnlyCell(ws, value=value)
+    if source is not None and source.has_style:
+        cell.font = copy(source.font)
+        cell.border = copy(source.border)
+        cell.fill = copy(source.fill)
+        cell.number_format = source.number_format
+        cell.alignment = copy(source.alignment)
+        cell.protection = copy(source.protection)
+    return cell
+
+
+def _copy_layout(source, target, rows):
+    """
+    复制工作表属性（缩放打印等）、视图（缩放比例、冻结窗格）、默认行高、列宽、行高、合并单元格、
+    页面设置、页眉页脚与分页符（只写工作表须在写入行之前设置）
+    """
+    target.sheet_properties = copy(source.sheet_properties)
+    target.views = copy(source.views)
+    target.sheet_format = copy(source.sheet_format)
+    for key, dim in source.column_dimensions.items():
+        target.column_dimensions[key].width = dim.width
+        target.column_dimensions[key].hidden = dim.hidden
+    for idx in range(1, rows + 1):
+        if idx in source.row_dimensions and source.row_dimensions[idx].height is not None:
+            target.row_dimensions[idx].height = source.row_dimensions[idx].height
+    for merged in source.merged_cells.ranges:
+        target.merged_cells.add(str(merged))
+    for key in source.page_setup.__attrs__:  # PrintPageSetup 引用所属工作表，逐项复制
+        setattr(target.page_setup, key, getattr(source.page_setup, key))
+    target.page_margins = copy(source.page_margins)
+    target.print_options = copy(source.print_options)
+    target.HeaderFooter = copy(source.HeaderFooter)
+    target.row_breaks = copy(source.row_breaks)
+    target.col_breaks = copy(source.col_breaks)
+    if source.print_title_rows:
+        target.print_title_rows = source.print_title_rows
+    if source.print_title_cols:
+        target.print_title_cols = source.print_title_cols
+    if source.print_area:
+        target.print_area = source.print_area
+
+
+def _truncate_rows(source, rows):
+    """
+    读取工作表 XML，只保留前 rows 行：第一个行号大于 rows 的 <row> 起到 </sheetData> 前的内容
+    只解压、不解析；其后的合并单元格、页面设置等原样保留
+    """
+    kept, buf = [], b''
+    while True:  # 找到第一个多余的行
+        chunk = source.read(_CHUNK_SIZE)
+        buf += chunk
+        cut = next((m.start() for m in _ROW_TAG.finditer(buf) if int(m.group(1)) > rows), None)
+        if cut is not None:
+            kept.append(buf[:cut])
+            buf = buf[cut:]
+            break
+        if not chunk:
+            return b''.join(kept) + buf
+        tail = max(buf.rfind(b'<'), 0)  # 末尾可能是不完整的标签，留到下一块
+        kept.append(buf[:tail])
+        buf = buf[tail:]
+    while True:  # 跳过其余的行
+        end = buf.find(_SHEET_DATA_END)
+        if end >= 0:
+            kept.append(buf[end:])
+            break
+        chunk = source.read(_CHUNK_SIZE)
+        if not chunk:
+            raise ValueError("工作表 XML 不完整：缺少 </sheetData>")
+        buf = buf[-len(_SHEET_DATA_END):] + chunk
+    kept.append(source.read())
+    return b''.join(kept)
+
+
+def _load_truncated(template_path, rows):
+    """读取工作簿，各工作表只保留前 rows 行"""
+    reduced = io.BytesIO()
+    with zipfile.ZipFile(template_path) as source, zipfile.ZipFile(reduced, 'w') as target:
+        for info in source.infolist():
+            with source.open(info) as f:
+                is_sheet = info.filename.startswith('xl/worksheets/') and info.filename.endswith('.xml')
+                target.writestr(info.filename, _truncate_rows(f, rows) if is_sheet else f.read())
+    reduced.seek(0)
+    return load_workbook(reduced)
+
+
+def load_template(template_path):
+    """
+    读取电访记录表模板，只需活动工作表的表头及带序号的模板行（A列不为空的连续行）与其余工作表
+    模板常是上次生成的输出文件（数十万行），各工作表先只读入前 TEMPLATE_ROWS 行，
+    模板行或其余工作表超出时才加大重读，其后的记录只解压、不解析
+    """
+    rows = TEMPLATE_ROWS
+    while True:
+        template = _load_truncated(template_path, rows)
+        others_complete = all(ws.max_row < rows for ws in template.worksheets if ws is not template.active)
+        first_cells = template.active.iter_rows(min_row=2, max_row=rows, max_col=1, values_only=True)
+        if others_complete and any(value is None for value, in first_cells):
+            return template
+        rows *= 16
+
+
+class StreamingXlsxWriter:
+    """
+    流式写出电访记录表：以只写模式新建工作簿，沿用模板各工作表的内容、样式与列宽，
+    活动工作表保留表头及带序号的模板行，生成的记录逐批追加，内存占用不随记录数增长
+    只写工作表的数据流不能中途恢复，续传（见 checkpoint.py）只保留已保存完的临时文件
+    """
+    def __init__(self, output_path, template_path, work_dir=None):
+        """work_dir: 指定时临时文件保存在该目录中，替换目标文件失败（如文件被占用）时保留，之后可重试"""
+        self.output_path = output_path
+        self.work_dir = work_dir
+        self._temp_path = None
+        template = load_template(template_path)
+        self.wb = Workbook(write_only=True)
+        for source in template.worksheets:
+            ws = self.wb.create_sheet(source.title)
+            if source is not template.active:
+                _copy_layout(source, ws, source.max_row)
+                for row in source.iter_rows():
+                    ws.append([_styled_cell(ws, cell, cell.value) for cell in row])
+                continue
+            # 模板行：表头之后序号（A列）不为空的行，超出部分为上次生成时追加的记录，不再沿用
+            rows = list(source.iter_rows(max_col=max(source.max_column, max(XLSX_COLUMNS.values()))))
+            header, body = rows[0], []
+            for row in rows[1:]:
+                if row[0].value is None:
+                    break
+                body.append(row)
+            _copy_layout(source, ws, len(body) + 1)
+            ws.append([_styled_cell(ws, cell, cell.value) for cell in header])
+            self.ws = ws
+            self._template_rows = body
+        self.wb.active = template.worksheets.index(template.active)
+        self.count = 0  # 已写入的记录数
+
+    def _template_row(self, row, values):
+        """模板行：保留样式与序号，生成字段所在列替换为新值"""
+        cells = []
+        for col_idx, cell in enumerate(row, start=1):
+            value = values.get(col_idx, cell.value) if values is not None else (None if col_idx in XLSX_COLUMNS.values() else cell.value)
+            cells.append(_styled_cell(self.ws, cell, value))
+        return cells
+
+    def write_batch(self, columns):
+        """追加一批列式记录"""
+        if self.count + len(columns['姓名']) > XLSX_MAX_RECORDS:
+            raise ValueError(f"超过 Excel 最大行数（{XLSX_MAX_RECORDS} 条记录），请改用 csv/parquet/jsonl 格式")
+        fields = [columns[key].tolist() for key in XLSX_COLUMNS]
+        width = max(XLSX_COLUMNS.values())
+        for record in zip(*fields):
+            if self.count < len(self._template_rows):
+                values = dict(zip(XLSX_COLUMNS.values(), record))
+                self.ws.append(self._template_row(self._template_rows[self.count], values))
+            else:
+                row = [None] * width
+                for col_idx, value in zip(XLSX_COLUMNS.values(), record):
+                    row[col_idx - 1] = value
+                self.ws.append(row)
+            self.count += 1
+
+    def finish(self):
+        """补齐未用到的模板行并保存到临时文件（commit() 时替换目标文件）"""
+        for row in self._template_rows[self.count:]:
+            self.ws.append(self._template_row(row, None))
+        self._template_rows = []
+        if self.work_dir is not None:
+            os.makedirs(self.work_dir, exist_ok=True)
+            tmp_path = os.path.join(self.work_dir, os.path.basename(self.output_path))
+        else:
+            tmp_path = temp_path(self.output_path, '.xlsx')
+        try:
+            self.wb.save(tmp_path)
+        except BaseException:
+            remove_quietly(tmp_path)
+            raise
+        self._temp_path = tmp_path
+
+    def pending_files(self):
+        """finish() 后尚未替换的 [(临时文件, 正式文件)]"""
+        return [(self._temp_path, self.output_path)] if self._temp_path else []
+
+    def commit(self):
+        """以临时文件替换目标文件"""
+        commit_files(self.pending_files())
+        self._temp_path = None
+
+    def close(self):
+        """保存文件：先写临时文件再替换；未指定 work_dir 时替换失败即删除临时文件"""
+        self.finish()
+        try:
+            self.commit()
+        except BaseException:
+            if self.work_dir is None:
+                remove_quietly(self._temp_path)
+            raise
+
+    def can_checkpoint(self, records):
+        """写入中途不能续写，总是返回 False"""
+        return False
+
+    def checkpoint(self):
+        """写入中途不能续写，总是返回 None"""
+        return None
+
+    def suspend(self):
+        """中断：与 abort() 相同"""
+        self.abort()
+
+    def abort(self):
+        """放弃写入：结束各工作表的临时流，不保存文件"""
+        for ws in self.wb.worksheets:
+            if not ws.closed:
+                ws.close()
+
+
+class ChunkedFileWriter:
+    """
+    CSV/JSONL/Parquet 写入器的公共部分：直接写出列式批次，可按 rows_per_file 切分为
+    name.part00000.csv 等多个文件；各文件先写入同目录的临时文件，close() 时才改为正式文件名，
+    中途取消或出错不会留下残缺文件
+    指定 work_dir 时临时文件为该目录中与正式文件同名的文件，checkpoint()/restore() 可在中断后续写
+    子类实现 _open(path)、_write(columns)、_close()，能续写的格式另实现 _flush()、_reopen(path) 并设 RESUMABLE = True
+    """
+    RESUMABLE = False  # 分片写到一半时能否保存进度并续写
+
+    def __init__(self, output_path, rows_per_file=None, work_dir=None):
+        self.output_path = output_path
+        self.rows_per_file = rows_per_file
+        self.work_dir = work_dir
+        self.count = 0  # 已写入的记录数
+        self.paths = []  # 输出文件（正式文件名）
+        self._temp_paths = []
+        self._part_rows = 0
+        self._opened = False
+
+    def part_path(self, index):
+        """第 index 个分片文件的路径，不分片时即输出文件"""
+        if not self.rows_per_file:
+            return self.output_path
+        root, ext = os.path.splitext(self.output_path)
+        return f"{root}.part{index:05d}{ext}"
+
+    def _temp_path(self, path):
+        """分片的临时文件"""
+        if self.work_dir is not None:
+            os.makedirs(self.work_dir, exist_ok=True)
+            return os.path.join(self.work_dir, os.path.basename(path))
+        return temp_path(path)
+
+    def _next_part(self):
+        """开始写下一个分片"""
+        path = self.part_path(len(self.paths))
+        tmp_path = self._temp_path(path)
+        self.paths.append(path)
+        self._temp_paths.append(tmp_path)
+        self._open(tmp_path)
+        self._opened = True
+        self._part_rows = 0
+
+    def write_batch(self, columns):
+        """追加一批列式记录，跨分片边界时切开"""
+        total = len(columns[FIELDS[0]])
+        start = 0
+        while start < total:
+            if not self._opened:
+                self._next_part()
+            stop = total if not self.rows_per_file else min(total, start + self.rows_per_file - self._part_rows)
+            self._write({key: columns[key][start:stop] for key in FIELDS})
+            self._part_rows += stop - start
+            self.count += stop - start
+            start = stop
+            if self.rows_per_file and self._part_rows >= self.rows_per_file:
+                self._close()
+                self._opened = False
+
+    def finish(self):
+        """结束最后一个分片（没有记录时也写出一个空文件）"""
+        if not self.paths:
+            self._next_part()
+        if self._opened:
+            self._close()
+            self._opened = False
+
+    def pending_files(self):
+        """finish() 后尚未替换的 [(临时文件, 正式文件)]"""
+        return list(zip(self._temp_paths, self.paths))
+
+    def commit(self):
+        """把全部临时文件替换为正式文件"""
+        commit_files(self.pending_files())
+        self._temp_paths = []
+
+    def close(self):
+        """结束写入并替换为正式文件；未指定 work_dir 时替换失败即删除尚未替换的临时文件"""
+        self.finish()
+        try:
+            self.commit()
+        except BaseException:
+            if self.work_dir is None:
+                for tmp_path in self._temp_paths:
+                    remove_quietly(tmp_path)
+                self._temp_paths = []
+            raise
+
+    def _flush(self):
+        """把当前分片已写的内容写到磁盘，返回能否从此处续写"""
+        return False
+
+    def can_checkpoint(self, records):
+        """写完前 records 条记录后能否保存进度：能续写的格式总是可以，其余只在分片边界"""
+        return self.RESUMABLE or bool(self.rows_per_file) and records % self.rows_per_file == 0
+
+    def checkpoint(self):
+        """
+        当前写入进度（可写入 JSON），须在两批之间调用，restore() 据此续写
+        当前分片写到一半且该格式不能续写（Parquet）时返回 None
+        """
+        if self._opened and not self._flush():
+            return None
+        return {'count': self.count, 'parts': len(self.paths), 'part_rows': self._part_rows, 'opened': self._opened,
+                'size': os.path.getsize(self._temp_paths[-1]) if self._opened else None}
+
+    def restore(self, state):
+        """从 checkpoint() 的进度续写（需要 work_dir）：删除之后才开始的分片，截掉当前分片之后写入的内容"""
+        self.count = state['count']
+        self._part_rows = state['part_rows']
+        self.paths = [self.part_path(i) for i in range(state['parts'])]
+        self._temp_paths = [self._temp_path(path) for path in self.paths]
+        index = state['parts']
+        while self.rows_per_file or index == 0:
+            tmp_path = self._temp_path(self.part_path(index))
+            if not os.path.exists(tmp_path):
+                break
+            os.remove(tmp_path)
+            index += 1
+        if state['opened']:
+            with open(self._temp_paths[-1], 'r+b') as f:
+                f.truncate(state['size'])
+            self._reopen(self._temp_paths[-1])
+            self._opened = True
+
+    def suspend(self):
+        """中断：关闭当前分片但保留临时文件，之后由 restore() 续写"""
+        if self._opened:
+            self._opened = False
+            self._close()
+
+    def abort(self):
+        """放弃写入：关闭并删除临时文件"""
+        try:
+            if self._opened:
+                self._close()
+        finally:
+            self._opened = False
+            for tmp_path in self._temp_paths:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._temp_paths = []
+
+
+class CsvWriter(ChunkedFileWriter):
+    """带缓冲的 CSV（UTF-8 BOM，Excel 可直接打开），每批由 csv 模块整体写出"""
+    BUFFER_SIZE = 1 << 20
+    RESUMABLE = True
+
+    def _open(self, path):
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='', buffering=self.BUFFER_SIZE)
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(FIELDS)
+
+    def _reopen(self, path):
+        self._file = open(path, 'a', encoding='utf-8', newline='', buffering=self.BUFFER_SIZE)  # 表头与 BOM 已写出
+        self._csv = csv.writer(self._file)
+
+    def _flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return True
+
+    def _write(self, columns):
+        self._csv.writerows(zip(*(columns[key].tolist() for key in FIELDS)))
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlWriter(ChunkedFileWriter):
+    """JSON Lines：每行一条记录；不含需转义字符的列直接拼接，不逐条调用 json.dumps"""
+    BUFFER_SIZE = 1 << 20
+    RESUMABLE = True
+    _UNSAFE = re.compile(r'["\\\x00-\x09\x0b-\x1f]')  # 需要转义的字符（换行符用作分隔，单独判断）
+
+    def __init__(self, output_path, rows_per_file=None, work_dir=None):
+        super().__init__(output_path, rows_per_file, work_dir)
+        keys = [json.dumps(key, ensure_ascii=False) for key in FIELDS]
+        self._row = '{{' + ', '.join(f'{key}: {{}}' for key in keys) + '}}\n'  # str.format 模板
+
+    def _open(self, path):
+        self._file = open(path, 'w', encoding='utf-8', newline='\n', buffering=self.BUFFER_SIZE)
+
+    def _reopen(self, path):
+        self._file = open(path, 'a', encoding='utf-8', newline='\n', buffering=self.BUFFER_SIZE)
+
+    def _flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return True
+
+    @classmethod
+    def _encode(cls, values):
+        """一列值编码为 JSON 字符串"""
+        values = values.tolist()
+        joined = '\n'.join(values)
+        if cls._UNSAFE.search(joined) is None and joined.count('\n') == len(values) - 1:
+            return ['"' + value + '"' for value in values]
+        return [json.dumps(value, ensure_ascii=False) for value in values]
+
+    def _write(self, columns):
+        fields = [self._encode(columns[key]) for key in FIELDS]
+        self._file.write(''.join(self._row.format(*values) for values in zip(*fields)))
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetWriter(ChunkedFileWriter):
+    """
+    Parquet（需要 pyarrow）：每个分片一个文件，按 row_group_size 划分行组，默认每批一个行组
+    文件尾写出前不能续写，只在分片之间保存进度（rows_per_file 为 batch_size 的整数倍时每个分片结束都可保存）
+    """
+    def __init__(self, output_path, rows_per_file=None, row_group_size=None, compression='snappy', work_dir=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("输出 Parquet 需要安装 pyarrow") from None
+        super().__init__(output_path, rows_per_file, work_dir)
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self._schema = pyarrow.schema([(key, pyarrow.string()) for key in FIELDS])
+
+    def _open(self, path):
+        self._writer = self._pq.ParquetWriter(path, self._schema, compression=self.compression)
+
+    def _write(self, columns):
+        arrays = [self._pa.array(columns[key], type=self._pa.string()) for key in FIELDS]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema), row_group_size=self.row_group_size)
+
+    def _close(self):
+        self._writer.close()
+
+
+class WriterThread:
+    """
+    专用写入线程：生成端 put() 批次，写入线程按顺序调用 writer.write_batch()，生成与写入同时进行
+    队列最多容纳 depth 批，写入跟不上时 put() 阻塞（背压），在途的批次数因此有上限
+    """
+    def __init__(self, writer, depth=PIPELINE_DEPTH, on_written=None, stats=None):
+        """
+        writer: 任一写入器
+        on_written: 每写完一批在写入线程中调用 on_written(batch)
+        stats: 可选的 profiling.RunStats，记录写入、回调与两端等待的用时
+        """
+        self.writer = writer
+        self.on_written = on_written
+        self.stats = stats if stats is not None else RunStats()
+        self.queue = Queue(maxsize=depth)
+        self.written = 0  # 已写入的记录数
+        self.error = None  # 写入线程中的异常，由 put()/finish() 在生成端重新抛出
+        self.submitted = 0  # 已交给写入线程的批次数
+        self.handled = 0  # 写入线程已取出的批次数（含出错或停止后丢弃的）
+        self._discard = False
+        self._closed = False  # 已取到结束标记
+        self._thread = threading.Thread(target=self._run, name='writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            with profile_thread():
+                self._consume()
+        except BaseException as e:
+            # 写入线程本身出错（如性能分析器无法启动）：记录异常并继续取出剩余批次，生成端不会阻塞在 put()
+            if self.error is None:
+                self.error = e
+            self._consume(timed=False)
+
+    def _consume(self, timed=True):
+        """逐批取出并写入，直到结束标记"""
+        while not self._closed:
+            if timed:
+                with self.stats.timer('wait_generate'):
+                    batch = self.queue.get()
+            else:
+                batch = self.queue.get()
+            try:
+                if batch is None:
+                    self._closed = True
+                else:
+                    self._write(batch)
+                    self.handled += 1
+            finally:
+                self.queue.task_done()
+
+    def _write(self, batch):
+        if self.error is not None or self._discard:
+            return  # 出错或已停止后只取出不写，避免生成端阻塞
+        try:
+            with self.stats.timer('write'):
+                self.writer.write_batch(batch)
+            self.written += len(batch[FIELDS[0]])
+            self.stats.count('records', len(batch[FIELDS[0]]))
+            self.stats.count('batches')
+            if self.on_written is not None:
+                with self.stats.timer('callback'):
+                    self.on_written(batch)
+        except BaseException as e:
+            self.error = e
+
+    def put(self, batch):
+        """交给写入线程；队列已满时等待"""
+        if self.error is not None:
+            raise self.error
+        with self.stats.timer('wait_write'):
+            self.queue.put(batch)
+        self.submitted += 1
+
+    def drain(self):
+        """等待已交出的批次全部写完（写入线程继续运行），用于保存进度；写入线程出错时抛出该异常"""
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def finish(self):
+        """等待全部批次写完；写入线程出错或有批次未经处理时抛出异常"""
+        self.queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        if self.handled != self.submitted:
+            raise RuntimeError(f"写入线程只处理了 {self.handled}/{self.submitted} 批")
+
+    def stop(self):
+        """丢弃尚未写入的批次并结束写入线程（不关闭 writer）"""
+        self._discard = True
+        self.queue.put(None)
+        self._thread.join()
+
+
+# 输出格式 → 写入器
+WRITERS = {
+    'xlsx': StreamingXlsxWriter,
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def open_writer(fmt, output_path, template_path=None, work_dir=None, **options):
+    """
+    按格式创建写入器（xlsx 需要模板）
+    work_dir: 可续传运行的临时文件目录（见 checkpoint.py）
+    options: 其余格式的选项，如 rows_per_file（每个分片文件的记录数）、row_group_size（Parquet 行组大小）
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"不支持的输出格式：{fmt}")
+    if fmt == 'xlsx':
+        if any(value is not None for value in options.values()):
+            raise ValueError(f"xlsx 格式不支持这些选项：{', '.join(options)}")
+        return WRITERS[fmt](output_path, template_path, work_dir)
+    return WRITERS[fmt](output_path, work_dir=work_dir, **options)